@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Microbenchmarks of the hot paths of cryptotvgen
+
+Uses the `dummy_lwc` reference implementation bundled with this repository.
+Build its libraries first (from this directory):
+
+    $ cryptotvgen --prepare_libs --candidates_dir ../../dummy_lwc_ref
+
+Results are written to `results/<cryptotvgen version>.json` and can be compared
+with those of an earlier release:
+
+    $ python bench_generator.py --compare results/1.2.0.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from cryptotvgen import cli, generator
+from cryptotvgen.options import get_parser
+from cryptotvgen.version import __version__
+
+script_dir = Path(__file__).parent.resolve()
+candidates_dir = script_dir.parent.parent / "dummy_lwc_ref"
+results_dir = script_dir / "results"
+
+ALG_OPTS = [
+    "--aead", "dummy_lwc",
+    "--hash", "dummy_lwc",
+    "--key_size", "128",
+    "--npub_size", "96",
+    "--nsec_size", "0",
+    "--tag_size", "128",
+    "--message_digest_size", "256",
+    "--block_size", "128",
+    "--block_size_ad", "128",
+    "--block_size_msg_digest", "128",
+    "--candidates_dir", str(candidates_dir),
+    "--lib_path", str(candidates_dir / "lib"),
+    "--seed", "1",
+]  # fmt: skip
+
+IO_WIDTHS = (8, 32)
+
+
+def make_opts(io_width, *args):
+    """Options as prepared by `cli.run_cryptotvgen` (without determine_params)"""
+    opts = get_parser().parse_args(
+        [*ALG_OPTS, "--io", str(io_width), str(io_width), *args]
+    )
+    opts.msg_format = list(opts.msg_format)
+    return opts
+
+
+def make_tv(opts, size, decrypt=False, hashop=False):
+    rng = generator.RandomSource(seed=size)
+    key, npub, data = rng.bytes(16), rng.bytes(12), rng.bytes(size)
+    return generator.TestVector(
+        opts, 1, 1, 1, decrypt, key, npub, b"", data, data, hashop
+    )
+
+
+def render(opts, size, decrypt=False, hashop=False):
+    """Compute and format a new test vector (`gen_tv`), end-to-end"""
+    # measure the library call, not a lookup of the output in the memo
+    generator.memo.clear()
+    tv = make_tv(opts, size, decrypt, hashop)
+    tv.gen_tv(generator.TextBlocks())
+
+
+def run_gen_benchmark(io_width):
+    """A full `--gen_benchmark` run"""
+    generator.memo.clear()
+    with tempfile.TemporaryDirectory() as dest, contextlib.redirect_stdout(
+        io.StringIO()
+    ):
+        cli.run_cryptotvgen(
+            [
+                *ALG_OPTS,
+                "--io", str(io_width), str(io_width),
+                "--gen_benchmark",
+                "--dest", dest,
+            ],  # fmt: skip
+            logfile=None,
+        )
+
+
+def get_benchmarks():
+    """Name and function of each benchmark"""
+    rng = generator.RandomSource(seed=1)
+    benchmarks = [
+        ("gen_data[1024]", lambda: generator.gen_data(1024, 0, rng=rng)),
+        ("get_len", lambda: generator.get_len((32, 32), 1000, 2000)),
+    ]
+    for io_width in IO_WIDTHS:
+        opts = make_opts(io_width)
+        data = rng.bytes(1024)
+        benchmarks.append(
+            (
+                f"build_sgmt[io={io_width},1024]",
+                lambda opts=opts, data=data, io_info=(io_width, 1): generator.build_sgmt(
+                    [], data, "pt", 0, opts, io_info, (0, 1, 1, 1)
+                ),
+            )
+        )
+        for size in (16, 1024):
+            benchmarks += [
+                (
+                    f"gen_tv[io={io_width},enc,{size}]",
+                    lambda opts=opts, size=size: render(opts, size),
+                ),
+                (
+                    f"gen_tv[io={io_width},hash,{size}]",
+                    lambda opts=opts, size=size: render(opts, size, hashop=True),
+                ),
+            ]
+    opts = make_opts(
+        32, "--cc_hls", "--cc_pad_enable", "--cc_pad_ad", "1", "--cc_pad_d", "2"
+    )
+    tv = make_tv(opts, 1024)
+    generator.compute_tvs([tv])
+    benchmarks.append(
+        ("gen_cc_hls[1024]", lambda: tv.gen_cc_hls(generator.TextBlocks()))
+    )
+    for io_width in IO_WIDTHS:
+        benchmarks.append(
+            (
+                f"gen_benchmark[io={io_width}]",
+                lambda io_width=io_width: run_gen_benchmark(io_width),
+            )
+        )
+    return benchmarks
+
+
+def measure(func, repeat):
+    """Best time per call in seconds over `repeat` runs of timeit"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "-k", metavar="SUBSTRING", help="only run benchmarks containing SUBSTRING"
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of timeit runs (default: 5)"
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=results_dir / f"{__version__}.json",
+        help="results file (default: results/<version>.json)",
+    )
+    parser.add_argument(
+        "--compare", type=Path, metavar="JSON", help="results of an earlier run"
+    )
+    opts = parser.parse_args(args)
+
+    baseline = {}
+    if opts.compare:
+        with open(opts.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    print("{:<32} {:>14} {:>10}".format("Benchmark", "Time [us]", "Change"))
+    for name, func in get_benchmarks():
+        if opts.k and opts.k not in name:
+            continue
+        seconds = measure(func, opts.repeat)
+        results[name] = seconds
+        change = ""
+        if name in baseline:
+            change = "{:+.1%}".format(seconds / baseline[name] - 1)
+        print("{:<32} {:>14.2f} {:>10}".format(name, seconds * 1e6, change))
+
+    os.makedirs(opts.output.parent, exist_ok=True)
+    with open(opts.output, "w") as f:
+        json.dump(
+            {
+                "version": __version__,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "processor": platform.processor(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {opts.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
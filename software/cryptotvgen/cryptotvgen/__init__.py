@@ -1,7 +1,8 @@
 from . import cli
+from .api import Generator, render
 from .version import __version__, __project__
 
 __author__ = "Ekawat (Ice) Homsirikamol and William Diehl"
 
 
-__all__ = ["cli"]
+__all__ = ["cli", "Generator", "render"]
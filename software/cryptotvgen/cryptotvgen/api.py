@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+In-process API of cryptotvgen
+
+Generates test vectors without parsing command line arguments and without
+writing files, e.g.:
+
+    from cryptotvgen import Generator, render
+
+    gen = Generator(
+        aead="dummy_lwc",
+        candidates_dir="dummy_lwc_ref",
+        io=(32, 32),
+        gen_test_routine=(1, 22, 0),
+        seed=1,
+    )
+    for tv in gen.vectors():
+        print(tv.msg_id, tv.ct.hex(), tv.tag.hex())
+
+    files = render(gen.vectors())  # {"pdi.txt": ..., "sdi.txt": ..., "do.txt": ...}
+
+Options have the names of the command line options, and the values as they
+are stored by the command line parser, e.g. `gen_test_routine=(1, 22, 0)` for
+`--gen_test_routine 1 22 0`, `gen_custom` as a list of
+[new_key, decrypt, ad_size, data_size, hash] entries, and `gen_single` as a list
+of [op, key, npub, nsec, ad, data] entries (hexadecimal strings).
+"""
+
+import copy
+import functools
+import itertools
+import os
+import pathlib
+import random
+
+from .cli import complete_opts, generate
+from .generator import (
+    BATCH_SIZE,
+    RandomSource,
+    TextBlocks,
+    compute_tvs,
+    gen_vectors,
+    render_tv,
+    uses_random_data,
+)
+from .options import get_parser, routines
+
+__all__ = ["Generator", "render"]
+
+GEN_BENCHMARK = routines.index("gen_benchmark")
+
+
+@functools.lru_cache(maxsize=None)
+def default_opts():
+    """Default values of all options (the command line parser runs only once)"""
+    return get_parser().parse_args([])
+
+
+def selected_routines(opts):
+    """Routines selected by the options, in the order of `options.routines`"""
+    selected = []
+    for index, name in enumerate(routines[: GEN_BENCHMARK + 1]):
+        value = getattr(opts, name, None)
+        if name == "gen_single":
+            selected += [index] * len(value or [])
+        elif value:
+            selected.append(index)
+    return selected
+
+
+class Generator:
+    """Generates test vectors in the current process
+
+    `config` is a mapping of options, or an options namespace (e.g. returned by
+    `options.get_parser().parse_args`). Keyword arguments override single
+    options. Unless `routines` is given, the selected routines run in the
+    order of `options.routines`.
+
+    Missing parameters are read from the 'api.h' of the implementation once,
+    when the generator is created. Raises ValueError for combinations of
+    options that the command line rejects (see `cli.validate_opts`).
+    """
+
+    def __init__(self, config=None, **options):
+        opts = copy.copy(default_opts())
+        if config is not None:
+            options = dict(
+                config.items() if hasattr(config, "items") else vars(config).items(),
+                **options,
+            )
+        unknown = set(options) - set(vars(opts)) - {"routines"}
+        if unknown:
+            raise TypeError(f"Unknown options: {', '.join(sorted(unknown))}")
+        for name, value in options.items():
+            # argparse stores multiple values as lists (shown in the file headers)
+            setattr(opts, name, list(value) if isinstance(value, tuple) else value)
+        if "routines" not in options:
+            opts.routines = selected_routines(opts)
+        if not opts.routines:
+            raise ValueError(
+                "No test vectors selected, set at least one of: "
+                + ", ".join(routines[: GEN_BENCHMARK + 1])
+            )
+        if opts.candidates_dir:
+            opts.candidates_dir = pathlib.Path(opts.candidates_dir)
+        if opts.seed is None and uses_random_data(opts):
+            opts.seed = random.SystemRandom().randrange(1 << 32)
+        complete_opts(opts)
+        self.opts = opts
+
+    def vectors(self):
+        """Generate and compute the test vectors of all selected routines
+
+        Each call starts from `seed` again, so the same test vectors are
+        generated every time. With `verify_lib="full"`, the test vectors are
+        verified in this process as well (there is no pool of workers).
+        """
+        if GEN_BENCHMARK in self.opts.routines:
+            raise ValueError("gen_benchmark only writes files, use `write_files`")
+        rng = RandomSource(self.opts.data_source, self.opts.seed)
+        dataset = gen_vectors(self.opts, rng)
+        verify_full = self.opts.verify_lib == "full"
+        for batch in iter(lambda: list(itertools.islice(dataset, BATCH_SIZE)), []):
+            compute_tvs(batch)
+            if verify_full:
+                for tv in batch:
+                    if tv.is_verified():
+                        tv.verify()
+            yield from batch
+
+    def write_files(self, dest=None):
+        """Write the test vector files to `dest` (default: the `dest` option),
+        as the command line tool does. Returns the path of `dest`."""
+        opts = copy.copy(self.opts)
+        if dest is not None:
+            opts.dest = str(dest)
+        os.makedirs(opts.dest, exist_ok=True)
+        generate(opts)
+        return opts.dest
+
+
+def render(vectors, sink=None):
+    """Format test vectors as in the test vector files
+
+    `sink` is an object with a `write(file_name, text)` method, which is called
+    with the text of each test vector in each file (e.g. `generator.TVWriter`).
+    Without a sink, returns a dict with the text of each file (without the
+    file headers).
+    """
+    out = TextBlocks() if sink is None else sink
+    for tv in vectors:
+        render_tv(tv, out)
+    if sink is not None:
+        return sink
+    files = {}
+    for file_name, txt in out.blocks:
+        files.setdefault(file_name, []).append(txt)
+    return {file_name: "".join(parts) for file_name, parts in files.items()}
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Binary container of test vectors (`--binary_kat`)
+
+A compact alternative to the PDI, SDI, and DO text files, which can be
+memory-mapped by post-processing tools instead of being parsed line by line.
+
+Layout (little-endian):
+    header:  magic b"LWCKAT", format version (u16), io width in bits (u16)
+    records: record type (u8), length of the payload in bytes (u32), payload
+
+Each record holds one line of the text format, comments are not kept:
+    INS, HDR, DAT, STT: the hexadecimal value of the line as bytes
+    TB:                 instruction in a DO file in the encoding used by the
+                        testbench (`# TB :XXXXX`)
+
+Convert a binary file to the text format with:
+    cryptotvgen-binkat pdi.bin pdi.txt
+"""
+
+import argparse
+import binascii
+import mmap
+import struct
+from enum import IntEnum
+
+__all__ = ["Record", "BinKatWriter", "BinKatReader", "encode_text", "to_text"]
+
+MAGIC = b"LWCKAT"
+VERSION = 1
+HEADER = struct.Struct("<6sHH")
+RECORD = struct.Struct("<BI")
+
+
+class Record(IntEnum):
+    INS = 1
+    HDR = 2
+    DAT = 3
+    STT = 4
+    TB = 5
+
+
+PREFIXES = {
+    "INS = ": Record.INS,
+    "HDR = ": Record.HDR,
+    "DAT = ": Record.DAT,
+    "STT = ": Record.STT,
+    "# TB :": Record.TB,
+}
+
+
+def encode_text(txt) -> bytes:
+    """Encode the INS/HDR/DAT/STT (and `# TB :`) lines of `txt` as records"""
+    records = []
+    for line in txt.splitlines():
+        rtype = PREFIXES.get(line[:6])
+        if rtype is None:
+            continue
+        value = line[6:].split(" ", 1)[0]
+        if len(value) % 2:
+            value = "0" + value
+        payload = binascii.unhexlify(value)
+        records.append(RECORD.pack(rtype, len(payload)))
+        records.append(payload)
+    return b"".join(records)
+
+
+class BinKatWriter:
+    """Writes a binary test vector file"""
+
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, path, width):
+        self.path = path
+        self.f = open(path, "wb", buffering=self.BUFFER_SIZE)
+        self.f.write(HEADER.pack(MAGIC, VERSION, width))
+
+    def write_text(self, txt):
+        self.f.write(encode_text(txt))
+
+    def close(self):
+        self.f.close()
+
+
+class BinKatReader:
+    """Memory-mapped binary test vector file
+
+    Iterating over a reader yields (record type, payload) tuples, where the
+    payload is a `memoryview` into the mapped file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, self.width = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{path} is not a binary test vector file")
+        if self.version != VERSION:
+            self.mm.close()
+            raise ValueError(f"{path}: unsupported format version {self.version}")
+
+    def __iter__(self):
+        view = memoryview(self.mm)
+        pos = HEADER.size
+        end = len(self.mm)
+        while pos < end:
+            rtype, size = RECORD.unpack_from(self.mm, pos)
+            pos += RECORD.size
+            yield Record(rtype), view[pos : pos + size]
+            pos += size
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def to_text(src, dst):
+    """Convert the binary test vector file `src` to the text file `dst`"""
+    with BinKatReader(src) as reader, open(dst, "w", newline="") as f:
+        f.write(f"# converted from {src}\n")
+        for rtype, payload in reader:
+            if rtype == Record.TB:
+                value = int.from_bytes(payload, "big")
+                f.write(f"# TB :{value:05X} (Encoding used by testbench)\n")
+            else:
+                value = binascii.hexlify(payload).upper().decode()
+                f.write(f"{rtype.name} = {value}\n")
+            del payload
+        f.write("###EOF\n")
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        prog="cryptotvgen-binkat",
+        description="Convert a binary test vector file (--binary_kat) to the text format",
+    )
+    parser.add_argument("src", help="binary test vector file")
+    parser.add_argument("dst", help="text file to write")
+    opts = parser.parse_args(args)
+    to_text(opts.src, opts.dst)
+    return 0
+
+
+if __name__ == "__main__":
+    main()
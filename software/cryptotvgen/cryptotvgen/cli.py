@@ -2,8 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import errno
+import logging
 import os
 import pathlib
+import random
+import shutil
 import sys
 import textwrap
 from typing import Union
@@ -11,19 +14,65 @@ from typing import Union
 from .generator import (
     determine_params,
     gen_benchmark_routine,
-    gen_dataset,
-    gen_hash,
-    gen_random,
-    gen_single,
-    gen_test_combined,
-    gen_test_routine,
     gen_tv_and_write_files,
+    gen_vectors,
+    invalidate_libs,
+    RandomSource,
+    uses_random_data,
 )
 
+from .kat_cache import cache_key, cache_lookup, cache_staging_dir, cache_store, cacheable, copy_tree
 from .log import setup_logger
-from .options import get_parser
+from .options import VALUE_CHECKS, get_parser
+from .profiling import profiler
 from .prepare_libs import ctgen_get_supercop_dir, prepare_libs
 
+log = logging.getLogger(__name__)
+
+
+def validate_opts(opts):
+    """Check the values of options that may not have been parsed (see
+    `options.VALUE_CHECKS`) and combinations of options, raises ValueError if
+    they are invalid"""
+    for name, check in VALUE_CHECKS.items():
+        value = getattr(opts, name, None)
+        if value is not None:
+            try:
+                check(value)
+            except ValueError as e:
+                raise ValueError(f"Option --{name}: {e}") from None
+    if opts.ciph_exp_noext and not opts.ciph_exp:
+        raise ValueError("Option --ciph_exp_noext requires --ciph_exp")
+    if opts.add_partial and not opts.ciph_exp:
+        raise ValueError("Option --add_partial requires --ciph_exp")
+    if opts.verify_lib_rate != 1.0 and not opts.verify_lib:
+        raise ValueError("Option --verify_lib_rate requires --verify_lib")
+    if opts.gen_random and opts.hash:
+        raise ValueError("`--gen_random` can only be used for AEAD test vectors")
+
+
+def complete_opts(opts):
+    """Validate the options (see `validate_opts`) and fill in the options that
+    are derived from other options: paths of the candidates and libraries,
+    parameters from 'api.h', and the message format"""
+    validate_opts(opts)
+    if not opts.candidates_dir:
+        d = ctgen_get_supercop_dir()
+        if not d.exists():
+            prepare_libs(sc_version=opts.supercop_version, libs=opts.prepare_libs,
+             candidates_dir=opts.candidates_dir, lib_path=opts.lib_path)
+            invalidate_libs()
+        opts.candidates_dir = d
+    # Automatically fill in any missing parameters from 'api.h'
+    determine_params(opts)
+
+    opts.msg_format = list(opts.msg_format)
+    if opts.offline:
+        opts.msg_format = ["len"] + opts.msg_format
+
+    if opts.candidates_dir and not opts.lib_path:
+        opts.lib_path = pathlib.Path(opts.candidates_dir) / "lib"
+
 
 ## validation can only be safely done when all args are parsed and stored!
 def run_cryptotvgen(
@@ -38,6 +87,15 @@ def run_cryptotvgen(
 
     setup_logger(logfile=logfile)
 
+    use_cache = opts.kat_cache and cacheable(opts)
+    if opts.kat_cache and not use_cache:
+        log.warning(
+            "--kat_cache requires --seed and a reproducible --data_source. Test vectors are not cached."
+        )
+    if opts.seed is None and uses_random_data(opts):
+        # draw a seed so that the run can be reproduced from the file headers
+        opts.seed = random.SystemRandom().randrange(1 << 32)
+
     if opts.prepare_libs:
         prepare_libs(
             sc_version=opts.supercop_version,
@@ -45,6 +103,7 @@ def run_cryptotvgen(
             candidates_dir=opts.candidates_dir,
             lib_path=opts.lib_path,
         )
+        invalidate_libs()
         return 0
     try:
         routines = opts.routines
@@ -58,24 +117,10 @@ def run_cryptotvgen(
                     """
         )
         sys.exit(error_txt)
-    if not opts.candidates_dir:
-        d = ctgen_get_supercop_dir()
-        if not d.exists():
-            print("here")
-            prepare_libs(sc_version=opts.supercop_version, libs=opts.prepare_libs,
-             candidates_dir=opts.candidates_dir, lib_path=opts.lib_path)
-        opts.candidates_dir = d
-    # Automatically fill in any missing parameters from 'api.h'
-    determine_params(opts)
-
-    # Additional error checking
-    opts.msg_format = list(opts.msg_format)
-    if opts.offline:
-        opts.msg_format = ["len"] + opts.msg_format
-    if opts.ciph_exp_noext and not opts.ciph_exp:
-        parser.error("Option --ciph_ext_noext requires --ciph_exp")
-    if opts.add_partial and not opts.ciph_exp:
-        parser.error("Option --add_partial requires --ciph_exp")
+    try:
+        complete_opts(opts)
+    except ValueError as e:
+        parser.error(str(e))
 
     if not os.path.exists(opts.dest):
         try:
@@ -84,49 +129,61 @@ def run_cryptotvgen(
             if e.errno != errno.EEXIST:
                 raise
 
-    # Generate Input Test Vectors
-    dataset = []
-    msg_no = 1
-    key_no = 1
-    gen_single_index = 0
-
-    if opts.candidates_dir and not opts.lib_path:
-        opts.lib_path = pathlib.Path(opts.candidates_dir) / "lib"
-
-    for routine in opts.routines:
-        if routine == 0:
-            data = gen_random(opts, msg_no, key_no)
-        elif routine == 1:
-            data = gen_dataset(
-                opts, opts.gen_custom, msg_no, key_no, opts.gen_custom_mode
+    if opts.profile:
+        profiler.enable()
+
+    if use_cache:
+        key = cache_key(opts)
+        entry = cache_lookup(key)
+        if entry is None:
+            dest = opts.dest
+            staging_dir = opts.dest = str(cache_staging_dir())
+            try:
+                generate(opts)
+            except BaseException:
+                # incomplete output (error or KeyboardInterrupt) is not kept
+                shutil.rmtree(staging_dir, ignore_errors=True)
+                raise
+            finally:
+                opts.dest = dest
+            entry = cache_store(key, staging_dir)
+        else:
+            log.info("Using cached test vectors: %s", entry)
+            if opts.verify_lib:
+                log.warning(
+                    "Test vectors are reused from the cache, --verify_lib is skipped."
+                )
+        copy_tree(entry, opts.dest)
+    else:
+        generate(opts)
+
+    if opts.profile:
+        profiler.disable()
+        print(profiler.report())
+        if opts.profile is not True:
+            profiler.write_json(opts.profile)
+
+    if 6 not in opts.routines:
+        print(
+            "Done! Please visit destination folder\n\t"
+            "{}\n"
+            "for generated files (pdi.txt, sdi.txt, and do.txt)".format(
+                os.path.abspath(opts.dest)
             )
-        elif routine == 2:
-            data = gen_test_routine(opts, msg_no, key_no)
-        elif routine == 3:  # Single
-            data = gen_single(opts, msg_no, key_no, gen_single_index)
-            gen_single_index += 1
-        elif routine == 4:  # Hash
-            data = gen_hash(opts, msg_no)
-        elif routine == 5:  # Combined AEAD and Hash
-            data = gen_test_combined(opts, msg_no, key_no)
-        elif routine == 6:
-            gen_benchmark_routine(opts)
-            return 0
-
-        dataset += data[0]
-        msg_no = data[1] + 1
-        key_no = data[2] + 1
-
-    gen_tv_and_write_files(opts, dataset)
-    print(
-        "Done! Please visit destination folder\n\t"
-        "{}\n"
-        "for generated files (pdi.txt, sdi.txt, and do.txt)".format(
-            os.path.abspath(opts.dest)
         )
-    )
     return 0
 
 
+def generate(opts):
+    """Generate the test vectors of all selected routines into `opts.dest`"""
+    rng = RandomSource(opts.data_source, opts.seed)
+
+    if 6 in opts.routines:
+        gen_benchmark_routine(opts, rng)
+        return
+
+    gen_tv_and_write_files(opts, gen_vectors(opts, rng))
+
+
 if __name__ == "__main__":
     run_cryptotvgen()
@@ -4,21 +4,27 @@ Ekawat (Ice) Homsirikimal and William Diehl
 Based on aeadtvgen 2.0.0 by Ekawat Homsirikamol (GMU CERG)
 """
 
+import argparse
 import binascii
+import copy
+import functools
+import hashlib
+import itertools
 import logging
 import math
 import os
 import random
 import sys
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from enum import Enum
 from pathlib import Path
-from typing import Any, List
-
-import cffi
+from typing import Any, Dict, List, Tuple
 
 from .options import routines
+from .binkat import BinKatWriter
 from .prepare_libs import AEAD_HEADER, HASH_HEADER, ctgen_get_supercop_dir, prepare_libs
+from .profiling import profiler
+from .result_store import get_result_store, inputs_digest
 from .version import __version__
 
 log = logging.getLogger(__name__)
@@ -35,8 +41,34 @@ __all__ = [
 ]
 
 
-ffi = cffi.FFI()
-ffi.cdef(AEAD_HEADER + HASH_HEADER)
+# Batch interface compiled into the libraries (see lwc_batch_aead.c and lwc_batch_hash.c)
+BATCH_HEADER = """
+    int lwc_batch_aead_encrypt(
+        unsigned long long n, const unsigned char *in,
+        const unsigned long long *desc, int with_nsec,
+        unsigned char *out, unsigned long long *out_desc
+    );
+    int lwc_batch_crypto_hash(
+        unsigned long long n, const unsigned char *in,
+        const unsigned long long *desc,
+        unsigned char *out, const unsigned long long *out_off
+    );
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def get_ffi():
+    """The cffi FFI of the AEAD and hash libraries, created on first use
+
+    Importing cffi and parsing the declarations takes a noticeable part of the
+    start-up time, which is not needed e.g. for `--help`.
+    """
+    import cffi
+
+    ffi = cffi.FFI()
+    ffi.cdef(AEAD_HEADER + HASH_HEADER + BATCH_HEADER)
+    return ffi
+
 
 HUMAN_READABLE_FILE = "test_vectors.txt"
 HLS_CC_DI_FILE = "cc_di.txt"
@@ -48,9 +80,9 @@ def unique(l: List[Any]) -> List[Any]:
     return list(OrderedDict.fromkeys(l))
 
 
-def print_header(opts):
+def get_header(opts):
     """
-    Print header file
+    Get the parameter header of the PDI, SDI, and DO files
     """
     ignore_opts = {
         "lib_path",
@@ -62,10 +94,17 @@ def print_header(opts):
         "candidates_dir",
         "supercop_version",
         "verify_lib",
+        "verify_lib_rate",
+        "result_store",
+        "profile",
         "routines",
         "verbose",
         "mode",
         "human_readable",
+        "jobs",
+        "chunk_size",
+        "kat_cache",
+        "binary_kat",
     } | set(routines)
 
     sorted_vars = [x for x in sorted(vars(opts)) if x not in ignore_opts]
@@ -79,35 +118,50 @@ def print_header(opts):
         value = getattr(opts, opt)
         if opt == "io":
             opt = "io (W,SW)"
-        elif opt == "block_size_ad":
+        elif opt in ("block_size_ad", "seed"):
             if value == None:
                 continue
+        elif opt == "data_source":
+            # only recorded if random data is generated (as the seed)
+            if not uses_random_data(opts):
+                continue
         txt += "# {:22} - {}\n".format(opt, value)
     txt += "#" * 79 + "\n\n"
+    return txt
 
-    for file_name in [opts.pdi_file, opts.sdi_file, opts.do_file]:
-        file_path = os.path.join(opts.dest, file_name)
-        with open(file_path, "w", newline="") as f:
-            f.write("#" * 79 + "\n")
-            f.write("# {}\n".format(file_name))
-            f.write(txt)
 
+def output_files(opts):
+    """Names of all files written for a set of test vectors"""
+    files = [opts.pdi_file, opts.sdi_file, opts.do_file]
     if opts.cc_hls:
-        file_path = os.path.join(opts.dest, HLS_CC_DI_FILE)
-        with open(file_path, "w", newline="") as f:
-            f.write("#DATA_FORMAT Data,Size,Type,Eoi,Eot,Partial\n")
-            f.write("#BEGIN\n\n")
-        file_path = os.path.join(opts.dest, HLS_CC_DO_FILE)
-        with open(file_path, "w", newline="") as f:
-            f.write("#DATA_FORMAT Data,Size\n")
-            f.write("#BEGIN\n\n")
-
+        files += [HLS_CC_DI_FILE, HLS_CC_DO_FILE]
     if opts.human_readable:
-        file_path = os.path.join(opts.dest, HUMAN_READABLE_FILE)
-        try:
-            os.remove(file_path)
-        except FileNotFoundError:
-            pass
+        files.append(HUMAN_READABLE_FILE)
+    return files
+
+
+def get_file_header(opts, file_name, header, out_name=None):
+    """Get the initial content of output file `file_name` (written as `out_name`)"""
+    if file_name in (opts.pdi_file, opts.sdi_file, opts.do_file):
+        txt = "#" * 79 + "\n"
+        txt += "# {}\n".format(out_name or file_name)
+        return txt + header
+    if file_name == HLS_CC_DI_FILE:
+        return "#DATA_FORMAT Data,Size,Type,Eoi,Eot,Partial\n#BEGIN\n\n"
+    if file_name == HLS_CC_DO_FILE:
+        return "#DATA_FORMAT Data,Size\n#BEGIN\n\n"
+    return ""
+
+
+def print_header(opts):
+    """
+    Print header file
+    """
+    header = get_header(opts)
+    for file_name in output_files(opts):
+        file_path = os.path.join(opts.dest, file_name)
+        with open(file_path, "w", newline="") as f:
+            f.write(get_file_header(opts, file_name, header))
 
 
 class Opcode(Enum):
@@ -185,24 +239,25 @@ txt_segment = {
 }
 
 
-def lenbytes(hexstr):
-    try:
-        return int(math.ceil(len(hexstr) / 2))
-    except TypeError:
-        return 0
+def hexstr(data) -> str:
+    """Uppercase hexadecimal string of a bytes-like object, converted in bulk"""
+    return binascii.hexlify(data).upper().decode()
+
+
+def cdata_bytes(cdata, size: int) -> bytes:
+    """Copy the first `size` bytes of a cffi `unsigned char[]` buffer into `bytes`"""
+    return get_ffi().buffer(cdata, size)[:]
 
 
 def get_len(format, ad_len, pt_len):
-    """Get segment length data hex format"""
+    """Get segment length data"""
 
     # Convert length to binary
     bin = "{:0{f[0]}b}{:0{f[1]}b}".format(ad_len, pt_len, f=format)
     # Make sure data is byte multiple
     bin += "0" * int((-len(bin)) % 8)
-    # Convert binary to hex string
     size = int(math.ceil((format[0] + format[1]) / 8))
-    hex = "{:0{s}X}".format(int(bin, 2), s=int(size * 2))
-    return hex
+    return int(bin, 2).to_bytes(size, "big")
 
 
 def get_msg_format(args, ofile, decrypt, hashop):
@@ -250,6 +305,70 @@ def get_msg_format(args, ofile, decrypt, hashop):
     return msg_format + tag
 
 
+class FormatPlan:
+    """Rendering steps of the segments of one output file (PDI or DO) for one
+    kind of test vector (encryption, decryption, or hash)
+
+    msg_format: all segment types, in order, as returned by `get_msg_format`
+    steps:      (index in msg_format, segment type, max. bytes per sub-segment
+                 or 0 for no split, apply ciphertext expansion rule, Last flag)
+                for each segment that is written
+    opcode:     the instruction of the test vector
+    """
+
+    def __init__(self, msg_format, steps, opcode):
+        self.msg_format = msg_format
+        self.steps = steps
+        self.opcode = opcode
+
+
+@functools.lru_cache(maxsize=None)
+def build_format_plan(
+    msg_format,
+    dec_msg_format,
+    ofile,
+    decrypt,
+    hashop,
+    max_block_per_sgmt,
+    block_size,
+    ciph_exp,
+):
+    opts = argparse.Namespace(msg_format=msg_format, dec_msg_format=dec_msg_format)
+    fmt = tuple(get_msg_format(opts, ofile, decrypt, hashop))
+    last = len(fmt) - 2 if hashop and ofile else len(fmt) - 1
+    steps = []
+    for i, sgt in enumerate(fmt):
+        if hashop and sgt not in ["pt", "ct", "hash", "hash_tag"]:
+            continue
+        # No segment split for tag/hash_tag
+        max_sgmt = 0
+        if sgt not in ["tag", "hash_tag"] and max_block_per_sgmt and block_size:
+            max_sgmt = (block_size // 8) * max_block_per_sgmt
+        split_last = ciph_exp and sgt in ["pt", "ct", "ct_tag"]
+        steps.append((i, sgt, max_sgmt, split_last, int(i == last)))
+    if hashop:
+        opcode = Opcode.hash
+    elif decrypt:
+        opcode = Opcode.decrypt
+    else:
+        opcode = Opcode.encrypt
+    return FormatPlan(fmt, tuple(steps), opcode)
+
+
+def get_format_plan(opts, ofile, decrypt, hashop) -> FormatPlan:
+    """Return the (cached) format plan of an output file for a kind of test vector"""
+    return build_format_plan(
+        tuple(opts.msg_format),
+        tuple(opts.dec_msg_format) if opts.dec_msg_format else None,
+        ofile,
+        bool(decrypt),
+        bool(hashop),
+        opts.max_block_per_sgmt,
+        opts.block_size,
+        bool(opts.ciph_exp),
+    )
+
+
 def get_test_vector_info(
     msgid, keyid, ad_len, pt_len, ct_len, decrypt, hashop, hash_tag_size
 ):
@@ -272,112 +391,146 @@ def get_test_vector_info(
     return txt
 
 
-def instr_info(f):
-    def wrapper(*args, **kwargs):
-        txt = "# Instruction: Opcode={}\n".format(txt_opcode[args[1]])
-        return "{}{}".format(txt, f(*args, **kwargs))
+@functools.lru_cache(maxsize=None)
+def build_instr(iowidth, opcode):
+    """Generate the (constant) instruction lines of `opcode` for a PDI/SDI file"""
+    word = opcode.value << (iowidth - 4)
+    return "# Instruction: Opcode={}\nINS = {:0{w}X}\n".format(
+        txt_opcode[opcode], word, w=iowidth // 4
+    )
 
-    return wrapper
 
+def build_tb_instr(opcode, msgid, keyid):
+    """Generate instruction lines of a DO file, with the encoding used by the testbench"""
+    msg_bits = max(8, msgid.bit_length())
+    key_bits = max(8, keyid.bit_length())
+    word = (((opcode.value << key_bits) | keyid) << msg_bits) | msgid
+    return (
+        f"# Instruction: Opcode={txt_opcode[opcode]}\n"
+        f"# TB :{word:05X} (Encoding used by testbench)\n"
+    )
 
-@instr_info
-def build_instr(iowidth, opcode, msgid, keyid, ofile=0):
-    """Generate instruction"""
-    if not ofile:
-        binstr = "{:04b}".format(opcode.value)
-        binstr += "0" * (-len(binstr) % iowidth)
-    else:
-        binstr = "{:04b}{:08b}{:08b}".format(opcode.value, keyid, msgid)
-        iowidth = 20
-    hexstr = "{:0{w}X}".format(int(binstr, 2), w=int(iowidth / 4))
-    if not ofile:
-        return "INS = {}\n".format(hexstr)
-    else:
-        return "# TB :{} (Encoding used by testbench)\n".format(hexstr)
-
-
-def sgmt_info(f):
-    def wrapper(*args, **kwargs):
-        # Argument dissection
-        data = args[0]
-        sgt = args[1]
-        ofile = args[2]
-        opts = args[3]
-        (iowidth, io_per_line) = args[4]
-        (is_partial, is_eoi, is_eot, is_lst) = args[5]
-
-        pt_txt = (
-            "Partial={} ".format(is_partial)
-            if opts.add_partial and sgt in ["pt", "ct", "ct_tag"]
-            else ""
-        )
-        last_txt = "EOI={} ".format(is_eoi) if (not ofile) else ""
-        txtsgmt = txt_segment[getattr(Segment, sgt)]
-        txt = "# Info : {:>24}, ".format(txtsgmt)
-        txt += "{}{}EOT={}, Last={}, Length={} bytes\n".format(
-            pt_txt, last_txt, is_eot, is_lst, lenbytes(data)
-        )
-        return "{}{}".format(txt, f(*args, **kwargs))
 
-    return wrapper
+@functools.lru_cache(maxsize=None)
+def sgmt_info_prefix(sgt, ofile, add_partial, is_partial, is_eoi, is_eot, is_lst):
+    """Constant part of the info line of a segment"""
+    pt_txt = (
+        "Partial={} ".format(is_partial)
+        if add_partial and sgt in ["pt", "ct", "ct_tag"]
+        else ""
+    )
+    last_txt = "EOI={} ".format(is_eoi) if (not ofile) else ""
+    txt = "# Info : {:>24}, ".format(txt_segment[getattr(Segment, sgt)])
+    txt += "{}{}EOT={}, Last={}, Length=".format(pt_txt, last_txt, is_eot, is_lst)
+    return txt
 
 
-def sgmt_hdr(f):
-    def wrapper(*args, **kwargs):
-        # Argument dissection
-        data = args[0]
-        sgt = args[1]
-        ofile = args[2]
-        opts = args[3]
-        (iowidth, io_per_line) = args[4]
-        (is_partial, is_eoi, is_eot, is_lst) = args[5]
+@functools.lru_cache(maxsize=None)
+def sgmt_hdr_flags(sgt, ofile, add_partial, is_partial, is_eoi, is_eot, is_lst):
+    """Segment type and flags: the upper 8 bits of a segment header"""
+    is_eoi = is_eoi if (not ofile) else 0
+    is_partial = is_partial if add_partial and sgt in ["pt", "ct", "ct_tag"] else 0
+    code = getattr(Segment, sgt).value
+    return (code << 4) | (is_partial << 3) | (is_eoi << 2) | (is_eot << 1) | is_lst
+
+
+def build_sgmt(lines, data, sgt, ofile, opts, io_info, flags):
+    """Generate a segment (info, header, and data lines) and append it to `lines`"""
+    with profiler.timer("build_sgmt"):
+        (iowidth, io_per_line) = io_info
+        length = len(data)
+        key = (sgt, ofile, opts.add_partial, *flags)
+        lines.append(f"{sgmt_info_prefix(*key)}{length} bytes\n")
+
+        # header: type and flags (8 bits), reserved (8 bits), length (16 bits),
+        # zero-padded to a multiple of `iowidth`
+        len_bits = max(16, length.bit_length())
+        hdr_bits = 16 + len_bits
+        pad_bits = -hdr_bits % iowidth
+        word = ((sgmt_hdr_flags(*key) << (8 + len_bits)) | length) << pad_bits
+        lines.append(f"HDR = {word:0{iowidth // 4}X}\n")
+
+        if length > 0:
+            # Convert the whole (zero-padded) segment at once, then split into lines
+            hexdata = hexstr(data + bytes(-length % (iowidth // 8)))
+            chars_per_line = iowidth // 4 * io_per_line
+            for begin in range(0, len(hexdata), chars_per_line):
+                lines.append(f"DAT = {hexdata[begin : begin + chars_per_line]}\n")
+
+
+@functools.lru_cache(maxsize=None)
+def build_status(iowidth):
+    """Generate build status"""
+    word = Status.success.value << (iowidth - 4)
+    return "# Status: Success\nSTT = {:0{w}X}\n".format(word, w=iowidth // 4)
 
-        is_eoi = is_eoi if (not ofile) else 0
-        is_partial = (
-            is_partial if opts.add_partial and sgt in ["pt", "ct", "ct_tag"] else 0
-        )
-        code = getattr(Segment, sgt).value
-        binstr = "{:04b}{}{}{}{}".format(code, is_partial, is_eoi, is_eot, is_lst)
-        binstr += "0" * 8 + "{:016b}".format(lenbytes(data))
-        binstr += "0" * (-len(binstr) % iowidth)
-        hexstr = "{:0{w}X}".format(int(binstr, 2), w=int(iowidth / 4))
-        return "HDR = {}\n{}".format(hexstr, f(*args, **kwargs))
-
-    return wrapper
-
-
-@sgmt_info
-@sgmt_hdr
-def build_sgmt(data, sgt, ofile, opts, io_info, flags):
-    """Generate a segment"""
-    (iowidth, io_per_line) = io_info
-    if len(data) > 0:
-        bytes_per_line = iowidth / 8 * io_per_line
-        tot_line = int(math.ceil(lenbytes(data) / bytes_per_line))
-        txt = ""
-
-        for i in range(tot_line):
-            begin = int(i * bytes_per_line * 2)
-            end = begin + int(bytes_per_line * 2)
-            if i == tot_line - 1:
-                d = data[begin:]
-                d += "00" * (-lenbytes(d) % int(iowidth / 8))
-                txt += "DAT = {}\n".format(d)
-            else:
-                txt += "DAT = {}\n".format(data[begin:end])
-        return txt
-    else:
-        return ""
 
+class ScratchBuffers:
+    """Per-process pool of reusable output buffers for library calls
 
-def build_status(iowidth):
-    """Generate build status"""
-    binstr = "{:04b}".format(Status.success.value)
-    binstr += "0" * (-len(binstr) % iowidth)
-    hexstr = "{:0{w}X}".format(int(binstr, 2), w=int(iowidth / 4))
-    txt = "# Status: Success\n"
-    txt += "STT = {}\n".format(hexstr)
-    return txt
+    Each named buffer is grown geometrically to the largest size requested so
+    far, so that (almost) no memory is allocated per test vector. Inputs are
+    passed without copying with `ffi.from_buffer`.
+    """
+
+    MIN_SIZE = 256
+
+    def __init__(self):
+        self.buffers = {}
+        self.ull = {}
+
+    def get(self, name, size):
+        """An `unsigned char[]` buffer of at least `size` bytes (content is undefined)"""
+        buf = self.buffers.get(name)
+        if buf is None or len(buf) < size:
+            new_size = self.MIN_SIZE if buf is None else 2 * len(buf)
+            buf = get_ffi().new("unsigned char[]", max(size, new_size))
+            self.buffers[name] = buf
+        return buf
+
+    def get_ull(self, name, value=0):
+        """An `unsigned long long *` set to `value`"""
+        ptr = self.ull.get(name)
+        if ptr is None:
+            ptr = self.ull[name] = get_ffi().new("unsigned long long *")
+        ptr[0] = value
+        return ptr
+
+
+scratch = ScratchBuffers()
+
+
+class ResultMemo:
+    """Bounded LRU memo of library outputs, keyed by `TestVector.memo_key`
+
+    Decryption test vectors usually follow an encryption with the same inputs,
+    so their ciphertext does not need to be computed again. The memo is kept
+    for the lifetime of the process (until `invalidate_libs`), so repeated runs
+    with deterministic data (gen_custom_mode 1 and 2) reuse the outputs of
+    earlier runs.
+    """
+
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self.results = OrderedDict()
+
+    def get(self, key):
+        output = self.results.get(key)
+        if output is not None:
+            self.results.move_to_end(key)
+        return output
+
+    def put(self, key, output):
+        self.results[key] = output
+        self.results.move_to_end(key)
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        self.results.clear()
+
+
+memo = ResultMemo()
 
 
 def get_cffi_path(opts, hashop) -> Path:
@@ -414,29 +567,259 @@ def get_cffi_path(opts, hashop) -> Path:
             candidates_dir=opts.candidates_dir,
             lib_path=opts.lib_path,
         )
+        invalidate_libs(lib_key(opts, hashop))
 
     return cffi_path
 
 
-class TestVector:
-    """TestVector class"""
+# Shared library handles opened so far, keyed by `lib_key`
+_lib_handles: Dict[Tuple[Any, Any, str], Any] = {}
 
-    BUFFER = "00" * 128
 
-    def __init__(
-        self, opts, msg_id, key_id, new_key, op, key, npub, nsec_pt, ad, pt, hashop
-    ):
+def lib_key(opts, hashop):
+    """Key of the AEAD or hash library in the cache of library handles"""
+    variant = f"hash/{opts.hash}" if hashop else f"aead/{opts.aead}"
+    return (str(opts.lib_path), str(opts.candidates_dir), variant)
 
-        self.hashop = hashop
-        cffi_path = get_cffi_path(opts, hashop)
 
+def load_lib(opts, hashop):
+    """Return the (process-wide cached) handle of the AEAD or hash library"""
+    key = lib_key(opts, hashop)
+    lib = _lib_handles.get(key)
+    if lib is None:
+        cffi_path = get_cffi_path(opts, hashop)
         if not cffi_path.exists():
             sys.exit(
                 f"Dynamic library {cffi_path} does not exist. Please make sure `lib_path` is correct and that you have already run `cryptotvgen --prepare_libs [--cadidates_dir=<PATH>]`?"
             )
+        with profiler.timer("dlopen"):
+            lib = get_ffi().dlopen(str(cffi_path))
+        assert lib, f"error opening shared library {cffi_path}"
+        log.debug("Opened shared library %s", cffi_path)
+        _lib_handles[key] = lib
+    return lib
+
+
+_lib_digests = {}
+
+
+def lib_digest(opts, hashop) -> str:
+    """SHA-256 of the AEAD or hash library file (cached per process)"""
+    cffi_path = get_cffi_path(opts, hashop)
+    digest = _lib_digests.get(cffi_path)
+    if digest is None:
+        if not cffi_path.exists():
+            return ""
+        h = hashlib.sha256()
+        with open(cffi_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                h.update(block)
+        digest = _lib_digests[cffi_path] = h.hexdigest()
+    return digest
+
+
+def invalidate_libs(key=None):
+    """Drop the cached handle of the library `key` (see `lib_key`), or of all
+    libraries, so that rebuilt libraries are reloaded
+
+    Handles are not closed, as test vectors may still use them. A library is
+    closed once its handle is no longer referenced.
+    """
+    memo.clear()
+    _lib_digests.clear()
+    if key is None:
+        _lib_handles.clear()
+    else:
+        _lib_handles.pop(key, None)
+
+
+class TVWriter:
+    """Keeps the output files in `opts.dest` open (with large buffers) while
+    test vectors are written to them.
+
+    If `opts.chunk_size` is set, the files are split into numbered chunks
+    (e.g. pdi_0000.txt, pdi_0001.txt, ...), each with its own header and EOF tag.
+    A new chunk is started with `next_chunk`.
+
+    With `opts.binary_kat`, the PDI, SDI, and DO files are also written in the
+    binary format of `binkat` (e.g. pdi.bin).
+    """
+
+    BUFFER_SIZE = 1 << 20
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.header = get_header(opts)
+        self.chunk_no = 0 if getattr(opts, "chunk_size", None) else None
+        self.files = {}
+        self.bin_files = {}
+        self.open_files()
+
+    def chunk_file_name(self, file_name):
+        if self.chunk_no is None:
+            return file_name
+        path = Path(file_name)
+        return f"{path.stem}_{self.chunk_no:04d}{path.suffix}"
+
+    def open_files(self):
+        for file_name in output_files(self.opts):
+            out_name = self.chunk_file_name(file_name)
+            file_path = os.path.join(self.opts.dest, out_name)
+            f = open(file_path, "w", newline="", buffering=self.BUFFER_SIZE)
+            f.write(get_file_header(self.opts, file_name, self.header, out_name))
+            self.files[file_name] = f
+        if getattr(self.opts, "binary_kat", False):
+            (iow, iosw) = self.opts.io
+            for file_name, width in [
+                (self.opts.pdi_file, iow),
+                (self.opts.sdi_file, iosw),
+                (self.opts.do_file, iow),
+            ]:
+                out_name = Path(self.chunk_file_name(file_name)).with_suffix(".bin")
+                file_path = os.path.join(self.opts.dest, out_name)
+                self.bin_files[file_name] = BinKatWriter(file_path, width)
+
+    def write(self, file_name, txt):
+        with profiler.timer("write"):
+            self.files[file_name].write(txt)
+        bin_file = self.bin_files.get(file_name)
+        if bin_file is not None:
+            bin_file.write_text(txt)
+
+    def next_chunk(self):
+        self.close()
+        self.chunk_no += 1
+        self.open_files()
+
+    def close(self, complete=True):
+        """Close the files of the current chunk
+
+        Unless `complete`, the test vectors were not all written (e.g. after an
+        error): the EOF tag is left out, so the files are visibly incomplete, and
+        the binary files (which have no EOF tag) are removed.
+        """
+        if not self.files:
+            return
+        if complete:
+            # Add EOF tag
+            for file_name in [
+                self.opts.pdi_file,
+                self.opts.do_file,
+                self.opts.sdi_file,
+            ]:
+                self.files[file_name].write("###EOF\n")
+        for f in self.files.values():
+            f.close()
+        for f in self.bin_files.values():
+            f.close()
+            if not complete:
+                os.remove(f.path)
+        if not complete:
+            log.error(
+                "Test vector generation failed, the files in %s are incomplete",
+                self.opts.dest,
+            )
+        self.files = {}
+        self.bin_files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(complete=exc_type is None)
+
+
+class TextBlocks:
+    """Collects the rendered text of test vectors as (file_name, text) blocks"""
+
+    def __init__(self):
+        self.blocks = []
+
+    def write(self, file_name, txt):
+        self.blocks.append((file_name, txt))
+
+
+class FileBlock:
+    """File-like accumulator for the text of one test vector in one output file"""
+
+    def __init__(self, out, file_name):
+        self.out = out
+        self.file_name = file_name
+        self.parts = []
+
+    def write(self, txt):
+        self.parts.append(txt)
+
+    def close(self):
+        self.out.write(self.file_name, "".join(self.parts))
+
+
+class TVResult:
+    """Outputs of a test vector"""
+
+    __slots__ = ("nsec_ct", "ct", "tag", "partial", "hash_tag")
 
-        self.lib = ffi.dlopen(str(cffi_path))
-        assert self.lib, f"error opening shared library {cffi_path}"
+    def __init__(self, nsec_ct=b"", ct=b"", tag=b"", partial=0, hash_tag=b""):
+        self.nsec_ct = nsec_ct
+        self.ct = ct
+        self.tag = tag
+        self.partial = partial
+        self.hash_tag = hash_tag
+
+
+EMPTY_RESULT = TVResult()
+
+
+def _output(name):
+    """Read-only attribute of a test vector for the output `name` of its result"""
+    return property(lambda self: getattr(self.result or EMPTY_RESULT, name))
+
+
+def init_worker(opts):
+    """Initializer of worker processes"""
+    if getattr(opts, "profile", False):
+        profiler.enable()
+
+
+class TestVector:
+    """TestVector class
+
+    All inputs and outputs are kept as `bytes` and are only converted to
+    hexadecimal strings when the test vector files are written.
+
+    Inputs are kept in slots of the test vector, outputs in a separate
+    `TVResult` once the test vector is computed. Pickled test vectors do not
+    include the library handle. The options are shared by all test vectors of
+    a batch, so they are pickled only once per batch (see `snapshot_opts`).
+    """
+
+    __slots__ = (
+        "opts",
+        "lib",
+        "hashop",
+        "msg_id",
+        "key_id",
+        "new_key",
+        "decrypt",
+        "key",
+        "npub",
+        "nsec_pt",
+        "ad",
+        "pt",
+        "result",
+    )
+    # All slots but the library handle are pickled
+    PICKLED = __slots__[:1] + __slots__[2:]
+
+    # Zero padding added after variable length inputs to prevent overflow
+    BUFFER = bytes(128)
+
+    def __init__(
+        self, opts, msg_id, key_id, new_key, op, key, npub, nsec_pt, ad, pt, hashop
+    ):
+
+        self.hashop = hashop
+        self.lib = load_lib(opts, hashop)
 
         self.key_id = 0 if hashop else key_id
         self.opts = opts
@@ -445,126 +828,145 @@ class TestVector:
         self.decrypt = op
         # Input
         self.key = key
-        self.npub = npub[: 2 * self.opts.npub_size // 8] if self.opts.npub_size else npub
-        self.nsec_pt = nsec_pt[: 2 * self.opts.nsec_size // 8] if self.opts.nsec_size else nsec_pt
+        self.npub = npub[: self.opts.npub_size // 8] if self.opts.npub_size else npub
+        self.nsec_pt = nsec_pt[: self.opts.nsec_size // 8] if self.opts.nsec_size else nsec_pt
         self.ad = ad
         self.pt = pt
-        self.partial = 0
         # Output
-        self.nsec_ct = ""
-        self.ct = ""
-        self.tag = ""
-        self.hash = pt
-        self.hash_tag = ""
-        self.hash_tag_size = (
-            self.opts.message_digest_size // 8
-            if self.opts.message_digest_size is not None
-            else None
-        )
+        self.result = None
+
+    nsec_ct = _output("nsec_ct")
+    ct = _output("ct")
+    tag = _output("tag")
+    partial = _output("partial")
+    hash_tag = _output("hash_tag")
+
+    @property
+    def hash(self):
+        return self.pt
+
+    @property
+    def hash_tag_size(self):
+        if self.opts.message_digest_size is None:
+            return None
+        return self.opts.message_digest_size // 8
+
+    @property
+    def computed(self):
+        return self.result is not None
 
     def aead_encrypt(self):
-        """Compute aead algorithm"""
-        pt_len = lenbytes(self.pt)
-        buf_len = lenbytes(self.BUFFER)
+        """Compute aead algorithm, returns (nsec_ct, ct, tag, partial)"""
+        return self.split_ciphertext(self.aead_encrypt_output())
+
+    def aead_encrypt_output(self):
+        """Compute aead algorithm, returns the output of `crypto_aead_encrypt`"""
+        ffi = get_ffi()
+        pt_len = len(self.pt)
+        buf_len = len(self.BUFFER)
         # Prepare input to C function (add buffer to prevent overflow)
-        m = ffi.new("const unsigned char[]", binascii.unhexlify(self.pt + self.BUFFER))
+        m = ffi.from_buffer(self.pt + self.BUFFER)
         mlen = ffi.cast("unsigned long long", pt_len)
-        c = ffi.new("unsigned char[]", binascii.unhexlify("00" * (pt_len + buf_len)))
-        clen = ffi.new("unsigned long long *", pt_len + buf_len)
-        ad = ffi.new("const unsigned char[]", binascii.unhexlify(self.ad + self.BUFFER))
-        adlen = ffi.cast("unsigned long long", lenbytes(self.ad))
+        c = scratch.get("c", pt_len + buf_len)
+        clen = scratch.get_ull("clen", pt_len + buf_len)
+        ad = ffi.from_buffer(self.ad + self.BUFFER)
+        adlen = ffi.cast("unsigned long long", len(self.ad))
         if self.opts.nsec_size > 0:
-            nsec = ffi.new("const unsigned char[]", binascii.unhexlify(self.nsec_pt))
+            nsec = ffi.from_buffer(self.nsec_pt)
         else:
             nsec = ffi.NULL
-        npub = ffi.new("const unsigned char[]", binascii.unhexlify(self.npub))
-        key = ffi.new("const unsigned char[]", binascii.unhexlify(self.key))
+        npub = ffi.from_buffer(self.npub)
+        key = ffi.from_buffer(self.key)
         # ABI level, in-line call
-        self.lib.crypto_aead_encrypt(c, clen, m, mlen, ad, adlen, nsec, npub, key)
+        with profiler.timer("aead_encrypt"):
+            self.lib.crypto_aead_encrypt(c, clen, m, mlen, ad, adlen, nsec, npub, key)
+
+        return cdata_bytes(c, clen[0])
+
+    def library_output(self):
+        """The output of the library call of this test vector"""
+        return self.crypto_hash() if self.hashop else self.aead_encrypt_output()
 
-        # Convert output to Hexadecimal
-        output = "".join(
-            "{:0>2}".format(hex(c[i])[2:].upper()) for i in range(0, clen[0])
+    def memo_key(self):
+        """Key of the library output of this test vector in `ResultMemo`"""
+        if self.hashop:
+            return (id(self.lib), True, self.hash_tag_size, self.pt)
+        return (
+            id(self.lib),
+            False,
+            self.opts.nsec_size > 0,
+            self.key,
+            self.npub,
+            self.nsec_pt,
+            self.ad,
+            self.pt,
         )
 
-        ns_len = int(self.opts.nsec_size / 8 * 2)
-        ct_len = int((clen[0] - self.opts.tag_size / 8) * 2 - ns_len)
+    def split_ciphertext(self, output):
+        """Split the output of `crypto_aead_encrypt` into (nsec_ct, ct, tag, partial)"""
+        ns_len = self.opts.nsec_size // 8
+        tag_len = self.opts.tag_size // 8
+        ct_len = len(output) - tag_len - ns_len
         partial = 0
         # Partial bit is located in the last byte
         if self.opts.add_partial:
-            ct_len = ct_len - 2
-            partial = output[-2:]
+            ct_len = ct_len - 1
+            partial = output[-1]
 
         nsec_ct = output[0:ns_len]
         ct = output[ns_len : ns_len + ct_len]
-        tag = output[
-            ns_len + ct_len : ns_len + ct_len + int((self.opts.tag_size / 8) * 2)
-        ]
+        tag = output[ns_len + ct_len : ns_len + ct_len + tag_len]
 
-        return (nsec_ct, ct, tag, int(partial))
+        return (nsec_ct, ct, tag, partial)
 
     def crypto_hash(self):
         """Compute aead algorithm"""
-        msg_len = lenbytes(self.pt)
-        buf_len = lenbytes(self.BUFFER)
+        ffi = get_ffi()
+        msg_len = len(self.pt)
+        buf_len = len(self.BUFFER)
         # Prepare input to C function (add buffer to prevent overflow)
-        m = ffi.new("const unsigned char[]", binascii.unhexlify(self.pt + self.BUFFER))
+        m = ffi.from_buffer(self.pt + self.BUFFER)
         mlen = ffi.cast("unsigned long long", msg_len)
-        c = ffi.new("unsigned char[]", binascii.unhexlify("00" * (msg_len + buf_len)))
+        c = scratch.get("c", max(msg_len, self.hash_tag_size) + buf_len)
         # ABI level, in-line call
-        self.lib.crypto_hash(c, m, mlen)
+        with profiler.timer("crypto_hash"):
+            self.lib.crypto_hash(c, m, mlen)
 
-        # Convert output to Hexadecimal
-        output = "".join(
-            "{:0>2}".format(hex(c[i])[2:].upper())
-            for i in range(0, int(self.hash_tag_size))
-        )
-        digest_len = 2 * int(self.hash_tag_size)
-        partial = 0
         # Partial bit is located in the last byte
         # if (self.opts.add_partial):
-        #    ct_len = ct_len-2
-        #    partial = output[-2:]
-        return output[0:digest_len]
+        #    ct_len = ct_len-1
+        #    partial = output[-1]
+        return cdata_bytes(c, int(self.hash_tag_size))
 
     def aead_decrypt(self):
         """Compute aead algorithm"""
-        ns_len = int(self.opts.nsec_size / 8)
-        ct_len = (
-            lenbytes(self.nsec_ct) + lenbytes(self.ct) + int(self.opts.tag_size / 8)
-        )
-        partial = ""
+        ffi = get_ffi()
+        ns_len = self.opts.nsec_size // 8
+        ct_len = len(self.nsec_ct) + len(self.ct) + self.opts.tag_size // 8
+        partial = b""
         if self.opts.add_partial:
             ct_len = ct_len + 1
-            partial = "01" * self.partial
+            partial = b"\x01" * self.partial
 
-        buf_len = lenbytes(self.BUFFER)
-        # Prepare input to C function (add buffer to prevent overflow)
-        m = ffi.new("unsigned char[]", binascii.unhexlify("00" * ct_len))
-        mlen = ffi.new("unsigned long long *", ct_len)
+        # Prepare input to C function
+        m = scratch.get("m", ct_len)
+        mlen = scratch.get_ull("mlen", ct_len)
         if self.opts.nsec_size > 0:
-            nsec = ffi.new("unsigned char[]", binascii.unhexlify("00" * ns_len))
+            nsec = scratch.get("nsec", ns_len)
         else:
             nsec = ffi.NULL
-        c = ffi.new(
-            "const unsigned char[]",
-            binascii.unhexlify(self.nsec_ct + self.ct + self.tag + partial),
-        )
+        c = ffi.from_buffer(self.nsec_ct + self.ct + self.tag + partial)
         clen = ffi.cast("unsigned long long", ct_len)
-        ad = ffi.new("const unsigned char[]", binascii.unhexlify(self.ad + self.BUFFER))
-        adlen = ffi.cast("unsigned long long", lenbytes(self.ad))
-        npub = ffi.new("const unsigned char[]", binascii.unhexlify(self.npub))
-        key = ffi.new("const unsigned char[]", binascii.unhexlify(self.key))
+        ad = ffi.from_buffer(self.ad + self.BUFFER)
+        adlen = ffi.cast("unsigned long long", len(self.ad))
+        npub = ffi.from_buffer(self.npub)
+        key = ffi.from_buffer(self.key)
         # ABI level, in-line call
         auth_result = self.lib.crypto_aead_decrypt(
             m, mlen, nsec, c, clen, ad, adlen, npub, key
         )
-        # Convert output to Hexadecimal
-        pt = "".join("{:0>2}".format(hex(m[i])[2:].upper()) for i in range(0, mlen[0]))
-        nsec_len = int(self.opts.nsec_size / 8)
-        nsec_pt = "".join(
-            "{:0>2}".format(hex(nsec[i])[2:].upper()) for i in range(0, nsec_len)
-        )
+        pt = cdata_bytes(m, mlen[0])
+        nsec_pt = cdata_bytes(nsec, ns_len) if ns_len > 0 else b""
 
         return (auth_result, nsec_pt, pt)
 
@@ -577,77 +979,122 @@ class TestVector:
         elif sgt == "ct_tag":
             data = getattr(self, "ct") + getattr(self, "tag")
         elif sgt == "len":
-            len_ad = lenbytes(self.ad)
+            len_ad = len(self.ad)
             if self.decrypt:
-                len_data = lenbytes(self.ct)
+                len_data = len(self.ct)
             else:
-                len_data = lenbytes(self.pt)
+                len_data = len(self.pt)
             len_format = (32, 32)
             if 32 < self.opts.io[0] < 64:
                 len_format = (self.opts.io[0], self.opts.io[0])
             data = get_len(len_format, len_ad, len_data)
         elif sgt == "adlen":
-            len_ad = lenbytes(self.ad)
-            data = f"{len_ad:0{32 // 4}X}"
+            data = len(self.ad).to_bytes(32 // 8, "big")
         elif sgt == "hash_tag":
             data = getattr(self, "hash_tag")
         else:
             data = getattr(self, sgt)
         return data
 
-    def is_last_vld_segment(self, sgt, msg_format):
-        """Determine whether this segment is the last valid data segment"""
+    def get_segments(self, msg_format):
+        """Resolve the data of all segments in `msg_format` at once
+
+        Returns a list of (segment type, data, EOI) tuples, where EOI is set
+        for the last valid (non-empty) data segment and for hash segments.
+        """
         ignore_sgts = ("len", "tag", "hash_tag")
-        if sgt in ignore_sgts:
-            return False
-        if sgt == "hash":
-            return True
-        if len(self.get_data(sgt)) <= 0:
-            return False
+        data = [self.get_data(sgt) for sgt in msg_format]
+        last_vld = -1
+        for i, sgt in enumerate(msg_format):
+            if sgt not in ignore_sgts and len(data[i]) > 0:
+                last_vld = i
+        return [
+            (sgt, d, int(sgt == "hash" or i == last_vld))
+            for i, (sgt, d) in enumerate(zip(msg_format, data))
+        ]
 
-        for i in range(msg_format.index(sgt) + 1, len(msg_format)):
-            if msg_format[i] in ignore_sgts:
-                continue
-            if len(self.get_data(msg_format[i])) > 0:
-                return False
-        return True
+    def __getstate__(self):
+        # Library handles can not be pickled, workers re-open them on demand.
+        return tuple(getattr(self, name) for name in self.PICKLED)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.PICKLED, state):
+            setattr(self, name, value)
+        self.lib = load_lib(self.opts, self.hashop)
 
-    def gen_tv(self):
-        """Generate test vector files based on provided options"""
+    def compute(self, output=None):
+        """Compute the outputs of the test vector
+
+        `output` is the result of a batched library call (see `compute_tvs`):
+        the message digest or the output of `crypto_aead_encrypt`.
+        """
         if self.hashop:
-            self.hash_tag = self.crypto_hash()
-            self.partial = int(self.partial)
+            hash_tag = self.crypto_hash() if output is None else output
+            self.result = TVResult(hash_tag=hash_tag)
 
-            log.debug("== Hash")
-            log.debug("Msg = {}".format(self.pt))
-            log.debug("Md = {}".format(self.hash_tag))
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("== Hash")
+                log.debug("Msg = {}".format(hexstr(self.pt)))
+                log.debug("Md = {}".format(hexstr(self.hash_tag)))
         else:
-            (self.nsec_ct, self.ct, self.tag, self.partial) = self.aead_encrypt()
-            self.partial = int(self.partial)
+            if output is None:
+                output = self.aead_encrypt()
+            else:
+                output = self.split_ciphertext(output)
+            (nsec_ct, ct, tag, partial) = output
+            self.result = TVResult(nsec_ct, ct, tag, int(partial))
             # Check for mismatching decrypted values and tag
-            log.debug("== AEAD Encrypt")
-            log.debug("Key = {}".format(self.key))
-            log.debug("Nonce = {}".format(self.npub))
-            log.debug("PT = {}".format(self.pt))
-            log.debug("AD = {}".format(self.ad))
-            log.debug("CT = {}{}".format(self.ct, self.tag))
-
-            if self.opts.verify_lib:
-                if self.opts.verbose:
-                    print(" ====================== ")
-                    print(" == Decryption Check == ")
-                    print(" ====================== ")
-                (auth_result, nsec_pt, pt) = self.aead_decrypt()
-                log.debug("== AEAD Decrypt")
-                log.debug("Auth result = {}".format(auth_result))
-                log.debug("Key = {}".format(self.key))
-                log.debug("Nonce = {}".format(self.npub))
-                log.debug("PT = {}".format(pt))
-                log.debug("AD = {}".format(self.ad))
-                log.debug("CT = {}{}".format(self.ct, self.tag))
-
-                assert pt == self.pt
-                assert auth_result == 0
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("== AEAD Encrypt")
+                log.debug("Key = {}".format(hexstr(self.key)))
+                log.debug("Nonce = {}".format(hexstr(self.npub)))
+                log.debug("PT = {}".format(hexstr(self.pt)))
+                log.debug("AD = {}".format(hexstr(self.ad)))
+                log.debug("CT = {}".format(hexstr(self.ct + self.tag)))
+
+            if self.opts.verify_lib != "full" and self.is_verified():
+                self.verify()
+
+    def is_verified(self):
+        """Whether the encryption of this test vector is verified by `--verify_lib`
+
+        With `--verify_lib_rate` below 1, a deterministic sample (based on the
+        seed and the message ID) of the test vectors is verified.
+        """
+        if not self.opts.verify_lib or self.hashop:
+            return False
+        rate = getattr(self.opts, "verify_lib_rate", 1.0)
+        if rate >= 1.0:
+            return True
+        h = hashlib.blake2b(
+            f"{self.opts.seed}:{self.msg_id}".encode(), digest_size=8
+        ).digest()
+        return int.from_bytes(h, "big") < rate * (1 << 64)
+
+    def verify(self):
+        """Check that decryption of the computed ciphertext gives back the plaintext"""
+        if self.opts.verbose:
+            print(" ====================== ")
+            print(" == Decryption Check == ")
+            print(" ====================== ")
+        with profiler.timer("verify"):
+            (auth_result, nsec_pt, pt) = self.aead_decrypt()
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("== AEAD Decrypt")
+            log.debug("Auth result = {}".format(auth_result))
+            log.debug("Key = {}".format(hexstr(self.key)))
+            log.debug("Nonce = {}".format(hexstr(self.npub)))
+            log.debug("PT = {}".format(hexstr(pt)))
+            log.debug("AD = {}".format(hexstr(self.ad)))
+            log.debug("CT = {}".format(hexstr(self.ct + self.tag)))
+
+        assert pt == self.pt
+        assert auth_result == 0
+
+    def gen_tv(self, out):
+        """Compute the outputs and write the PDI, DO, and SDI blocks of the test vector to `out`"""
+        if not self.computed:
+            compute_tvs([self])
 
         (iow, iosw) = self.opts.io
         io_info = (iow, self.opts.max_io_per_line)
@@ -656,82 +1103,55 @@ class TestVector:
 
         # PDI and DO file
         for ofile, file_name in enumerate([self.opts.pdi_file, self.opts.do_file]):
-            # Open file
-            file_path = os.path.join(self.opts.dest, file_name)
-            f = open(file_path, "a", newline="")
+            lines = []
 
             # Write Header
             txt = get_test_vector_info(
                 self.msg_id,
                 self.key_id,
-                lenbytes(self.ad),
-                lenbytes(self.pt),
-                lenbytes(self.ct),
+                len(self.ad),
+                len(self.pt),
+                len(self.ct),
                 self.decrypt,
                 self.hashop,
                 self.hash_tag_size,
             )
-            f.write("{}".format(txt))
+            lines.append(txt)
 
             if not ofile:
                 # Write New key
                 if self.new_key:
-                    txt = build_instr(iow, Opcode.actkey, self.msg_id, self.key_id)
-                    f.write("{}".format(txt))
+                    lines.append(build_instr(iow, Opcode.actkey))
+
+            plan = get_format_plan(self.opts, ofile, self.decrypt, self.hashop)
 
             # Instruction
-            if self.hashop:
-                opcode = Opcode.hash
-            elif self.decrypt:
-                opcode = Opcode.decrypt
+            if not ofile:
+                lines.append(build_instr(iow, plan.opcode))
             else:
-                opcode = Opcode.encrypt
-
-            # opcode = Opcode.decrypt if self.decrypt else Opcode.encrypt
-            txt = build_instr(iow, opcode, self.msg_id, self.key_id, ofile)
-
-            f.write("{}".format(txt))
+                lines.append(build_tb_instr(plan.opcode, self.msg_id, self.key_id))
 
             # Write Segment
-            msg_format = get_msg_format(self.opts, ofile, self.decrypt, self.hashop)
-            for i, sgt in enumerate(msg_format):
-
-                if self.hashop:
-                    if sgt not in ["pt", "ct", "hash", "hash_tag"]:
-                        continue
-
-                # Data getter
-                data = self.get_data(sgt)
+            segments = self.get_segments(plan.msg_format)
+            for i, sgt, max_sgmt, ciph_exp, last in plan.steps:
+                (_, data, eoi) = segments[i]
 
                 # Sub-segment
                 tot_sgmt = 1
-                max_sgmt = 0
-                # No segment split for tag/hash_tag
-                if (
-                    sgt not in ["tag", "hash_tag"]
-                    and self.opts.max_block_per_sgmt
-                    and self.opts.block_size
-                ):
-                    max_sgmt = (
-                        self.opts.block_size // 8
-                    ) * self.opts.max_block_per_sgmt
-                    tot_sgmt = max(1, int(math.ceil(lenbytes(data) / max_sgmt)))
+                if max_sgmt:
+                    tot_sgmt = max(1, -(-len(data) // max_sgmt))
 
                 is_eoi, is_eot, is_lst = (0, 0, 0)
                 for j in range(tot_sgmt):
-                    begin = int(j * max_sgmt * 2)
-                    end = begin + int(max_sgmt * 2)
+                    begin = j * max_sgmt
+                    end = begin + max_sgmt
                     if j == tot_sgmt - 1:
-                        is_eoi = int(self.is_last_vld_segment(sgt, msg_format))
-                        if self.hashop and ofile:
-                            is_lst = 1 if i == len(msg_format) - 2 else 0
-                        else:
-                            is_lst = 1 if i == len(msg_format) - 1 else 0
+                        is_eoi = eoi
+                        is_lst = last
                         is_eot = 1
                         d = data[begin:]
                     else:
                         d = data[begin:end]
-                    txt = ""
 
                     # ::Special rule for ciphertext expansion::
                     # Separates the last block in its own segment for
@@ -742,25 +1162,21 @@ class TestVector:
                     # expected padding value.
                     #
                     # For ciphertext, the last block cannot be empty.
-                    if (
-                        j == tot_sgmt - 1
-                        and self.opts.ciph_exp
-                        and sgt in ["pt", "ct", "ct_tag"]
-                    ):
+                    if j == tot_sgmt - 1 and ciph_exp:
                         # Split d into d[1], d[2] if condition applies
-                        rem = lenbytes(d) % int(self.opts.block_size / 8)
-                        if lenbytes(d) >= int(self.opts.block_size / 8):
+                        rem = len(d) % (self.opts.block_size // 8)
+                        if len(d) >= self.opts.block_size // 8:
                             if rem > 0:
-                                d = (d[: -int(rem * 2)], d[-int(rem * 2) :])
+                                d = (d[:-rem], d[-rem:])
                             else:
                                 if sgt == "pt" and not self.opts.ciph_exp_noext:
-                                    d = (d, "")
+                                    d = (d, b"")
                                 else:
-                                    if lenbytes(d) == int(self.opts.block_size / 8):
+                                    if len(d) == self.opts.block_size // 8:
                                         d = (d,)
                                     else:
-                                        rem = int(self.opts.block_size / 8)
-                                        d = (d[: -int(rem * 2)], d[-int(rem * 2) :])
+                                        rem = self.opts.block_size // 8
+                                        d = (d[:-rem], d[-rem:])
                         else:
                             d = (d,)
 
@@ -772,24 +1188,21 @@ class TestVector:
                             else:
                                 eoi = 0
                             flags = (is_partial, eoi, 0, 0)
-                            txt += build_sgmt(
-                                d[0], sgt, ofile, self.opts, io_info, flags
+                            build_sgmt(
+                                lines, d[0], sgt, ofile, self.opts, io_info, flags
                             )
                             d = d[1]
                         else:
                             d = d[0]
                     flags = (is_partial, is_eoi, is_eot, is_lst)
-                    txt += build_sgmt(d, sgt, ofile, self.opts, io_info, flags)
-
-                    f.write("{}".format(txt))
+                    build_sgmt(lines, d, sgt, ofile, self.opts, io_info, flags)
 
             if ofile:
                 # Write success
-                txt = build_status(iow)
-                f.write("{}".format(txt))
+                lines.append(build_status(iow))
 
-            f.write("\n")
-            f.close()
+            lines.append("\n")
+            out.write(file_name, "".join(lines))
 
         # ==========
         # SDI file
@@ -801,55 +1214,53 @@ class TestVector:
         flags = (0, 1, 1, 1)
         sgt = "key"
 
-        file_path = os.path.join(self.opts.dest, self.opts.sdi_file)
-        f = open(file_path, "a", newline="")
         # Instruction
-        txt = "#### MsgID={: 3}, KeyID={: 3}\n".format(self.msg_id, self.key_id)
-        txt += build_instr(iosw, Opcode.loadkey, self.msg_id, self.key_id)
+        lines = ["#### MsgID={: 3}, KeyID={: 3}\n".format(self.msg_id, self.key_id)]
+        lines.append(build_instr(iosw, Opcode.loadkey))
         # Segment
         data = self.get_data(sgt)
-        txt += build_sgmt(data, sgt, 0, self.opts, io_info, flags)
-        f.write("{}\n".format(txt))
-        f.close()
+        build_sgmt(lines, data, sgt, 0, self.opts, io_info, flags)
+        lines.append("\n")
+        out.write(self.opts.sdi_file, "".join(lines))
 
     def cc_pad(self, data, padmode, sgttype):
         # No padding
         if not self.opts.cc_pad_enable:
             return data
 
-        len = lenbytes(data)
+        len_ = len(data)
         if sgttype in ["npub_ad", "ad_npub", "ad"]:
-            rem = len % int(self.opts.block_size_ad / 8)
+            rem = len_ % int(self.opts.block_size_ad / 8)
         else:
-            rem = len % int(self.opts.block_size / 8)
+            rem = len_ % int(self.opts.block_size / 8)
 
         pad = (
             True
             if (rem > 0 and padmode > 0)
-            or (len == 0 and (padmode == 2 or padmode == 4))
-            or (rem == 0 and len > 0 and padmode > 2)
+            or (len_ == 0 and (padmode == 2 or padmode == 4))
+            or (rem == 0 and len_ > 0 and padmode > 2)
             else False
         )
 
         if pad:
             if self.opts.cc_pad_style == 1:
-                pad = "80"
+                pad = b"\x80"
             elif self.opts.cc_pad_style == 2:
                 if sgttype == "ad":
-                    pad = "03"
+                    pad = b"\x03"
                 else:
-                    pad = "02"
+                    pad = b"\x02"
             elif self.opts.cc_pad_style == 3:
-                pad = "01"
+                pad = b"\x01"
             else:
-                pad = "00"
+                pad = b"\x00"
         else:
-            pad = ""
+            pad = b""
 
         return data + pad
 
     def wr_cc_hls_segment(self, f, data, eoi, sgt, output=False):
-        len = lenbytes(data)
+        len_ = len(data)
         ad_type = ["npub_ad", "ad_npub", "ad"]
         # Add extra padding bits when block_size_ad < block_size_d
         if sgt in ad_type:
@@ -873,12 +1284,13 @@ class TestVector:
                 else:
                     # padding
                     data = self.cc_pad(data, self.opts.cc_pad_d, sgt)
-        data = data + "00" * ((blkbytes - lenbytes(data)) % blkbytes)
+        data = data + bytes((blkbytes - len(data)) % blkbytes)
+        hexdata = hexstr(data)
 
-        tot_blk = int(math.ceil(lenbytes(data) / blkbytes))
+        tot_blk = int(math.ceil(len(data) / blkbytes))
         # tot_blk = 1 if tot_blk == 0 else tot_blk
 
-        rem = True if (lenbytes(data) % blkbytes) > 0 else False
+        rem = True if (len(data) % blkbytes) > 0 else False
         partial = self.partial if sgt in data_type else 0
 
         sgt_type = "ad" if (sgt in ad_type) else "data" if (sgt in data_type) else sgt
@@ -887,15 +1299,15 @@ class TestVector:
         (is_eoi, is_eot) = (0, 0)
         for j in range(tot_blk):
             txt = (
-                data[int(j * blkbytes * 2) : int((j + 1) * blkbytes * 2)]
+                hexdata[j * blkbytes * 2 : (j + 1) * blkbytes * 2]
                 + extra_padding * "00"
             )
-            if len >= blkbytes:
+            if len_ >= blkbytes:
                 lenblk = blkbytes
-                len = len - blkbytes
+                len_ = len_ - blkbytes
             else:
-                lenblk = len
-                len = 0
+                lenblk = len_
+                len_ = 0
             if j == tot_blk - 1:
                 (is_eoi, is_eot) = (eoi, 1)
 
@@ -911,29 +1323,25 @@ class TestVector:
         if self.opts.ciph_exp and output and sgt == "pt":
             # Add an empty write output for plaintext data in
             # ciphertext expansion
-            if (lenbytes(data) % int(self.opts.block_size / 8)) == 0:
+            if (len(data) % int(self.opts.block_size / 8)) == 0:
                 f.write("{},{}\n".format("0" * blkbytes * 2, 0))
             return
 
-    def gen_cc_hls(self):
+    def gen_cc_hls(self, out):
         if not self.opts.cc_hls:
             return
         # ==========
         # DI file
         # ==========
-        file_path = os.path.join(self.opts.dest, HLS_CC_DI_FILE)
-        f = open(file_path, "a", newline="")
+        f = FileBlock(out, HLS_CC_DI_FILE)
         decrypt = 1 if self.decrypt else 0
         new_key = 1 if self.new_key else 0
         f.write("#NEW\n\tMessage Number #{}\n{}\n".format(self.msg_id, decrypt))
-        f.write("#KEY\n{}\n{}\n".format(new_key, self.key))
+        f.write("#KEY\n{}\n{}\n".format(new_key, hexstr(self.key)))
 
         # Write Segments
-        msg_format = get_msg_format(self.opts, 0, self.decrypt, self.hashop)
-        for i, sgt in enumerate(msg_format):
-            # Data getter
-            data = self.get_data(sgt)
-            eoi = int(self.is_last_vld_segment(sgt, msg_format))
+        plan = get_format_plan(self.opts, 0, self.decrypt, self.hashop)
+        for sgt, data, eoi in self.get_segments(plan.msg_format):
             self.wr_cc_hls_segment(f, data, eoi, sgt)
 
         f.write("#END\n\n")
@@ -942,22 +1350,18 @@ class TestVector:
         # ==========
         # DO file
         # ==========
-        file_path = os.path.join(self.opts.dest, HLS_CC_DO_FILE)
-        f = open(file_path, "a", newline="")
+        f = FileBlock(out, HLS_CC_DO_FILE)
         f.write("#NEW\n\tMessage Number #{}\n".format(self.msg_id))
-        msg_format = get_msg_format(self.opts, 1, self.decrypt, self.hashop)
-        for i, sgt in enumerate(msg_format):
-            data = self.get_data(sgt)
-            eoi = int(self.is_last_vld_segment(sgt, msg_format))
+        plan = get_format_plan(self.opts, 1, self.decrypt, self.hashop)
+        for sgt, data, eoi in self.get_segments(plan.msg_format):
             self.wr_cc_hls_segment(f, data, eoi, sgt, True)
         f.write("#END\n\n")
         f.close()
 
-    def gen_nist_tv(self):
+    def gen_nist_tv(self, out):
         if not self.opts.human_readable:
             return
-        file_path = os.path.join(self.opts.dest, "test_vectors.txt")
-        f = open(file_path, "a", newline="")
+        f = FileBlock(out, HUMAN_READABLE_FILE)
         f.write("#### Msg {:>3}\n".format(self.msg_id))
         attrs = [
             "key",
@@ -971,7 +1375,7 @@ class TestVector:
             "tag",
             "hash_tag",
         ]
-        if getattr(self, "hash_tag") == "":
+        if getattr(self, "hash_tag") == b"":
             hashop = False
         else:
             hashop = True
@@ -985,7 +1389,7 @@ class TestVector:
             if attr in ["nsec_pt", "nsec_ct"]:
                 if self.opts.nsec_size <= 0:
                     continue
-            f.write("{:7} = {}\n".format(attr, getattr(self, attr)))
+            f.write("{:7} = {}\n".format(attr, hexstr(getattr(self, attr))))
         f.write("\n")
         f.close()
 
@@ -995,39 +1399,96 @@ class TestVector:
 # ======================
 
 
-def gen_data(bytes: int, mode=0, init="06") -> str:
+class RandomSource:
+    """Per-run random number generator
+
+    All random choices of a run (sizes, operations, shuffling, key reuse) are
+    drawn from a `random.Random` instance seeded with `seed`. Random test
+    vector data is taken from the source selected by `--data_source`:
+
+    random:  the same `random.Random` instance
+    numpy:   NumPy's default bit generator, PCG64, seeded with `seed`
+    urandom: `os.urandom` (data is not reproducible)
+    """
+
+    # Sources of random test vector data (`--data_source`)
+    KINDS = ("random", "numpy", "urandom")
+
+    def __init__(self, kind="random", seed=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.randrange = self.random.randrange
+        self.randint = self.random.randint
+        self.shuffle = self.random.shuffle
+        if kind == "random":
+            self.bytes = self._random_bytes
+        elif kind == "numpy":
+            try:
+                import numpy
+            except ImportError:
+                sys.exit(
+                    "`--data_source numpy` requires NumPy. Please install it (`pip install numpy`)."
+                )
+            self.bytes = numpy.random.default_rng(seed).bytes
+        elif kind == "urandom":
+            self.bytes = os.urandom
+        else:
+            raise ValueError(f"Unknown data source: {kind}")
+        self.kind = kind
+
+    def _random_bytes(self, size):
+        # same as `random.Random.randbytes` (Python 3.9+)
+        return self.random.getrandbits(size * 8).to_bytes(size, "little")
+
+
+def gen_data(size: int, mode=0, init=0x06, rng=None) -> bytes:
     """Generate random data"""
-    if bytes == 0:
-        return ""
+    if size == 0:
+        return b""
     else:
         if mode == 0:
-            return "{d:0{s}X}".format(s=bytes * 2, d=random.randrange(256**bytes))
+            return (rng or RandomSource()).bytes(size)
         else:
-            init = int(init, 16)
-            data = "".join("{0:02X}".format((j + init) % 256) for j in range(bytes))
-            return data
+            return bytes((j + init) % 256 for j in range(size))
+
+
+@functools.lru_cache(maxsize=1024)
+def constant_data(size, value) -> bytes:
+    """`size` bytes of `value` (gen_custom_mode 1), cached by size"""
+    return bytes((value,)) * size
+
 
+@functools.lru_cache(maxsize=1024)
+def running_data(size) -> bytes:
+    """Running counter 00 01 02 ... of `size` bytes (gen_custom_mode 2), cached by size"""
+    return (bytes(range(256)) * (size // 256 + 1))[:size]
 
-def gen_dataset(opts, routine, start_msg_no, start_key_no, mode=0):
+
+def gen_dataset(opts, routine, start_msg_no, start_key_no, mode=0, rng=None):
     """
     Generate random dataset based on the specified routine with the following
     format: [[NEW_KEY(Boolean), Encryption/Decryption(Boolean,
               AD_SIZE, DATA_SIZE],
               ...,
             ]
+
+    This is a generator: test vectors are yielded one at a time, so `routine`
+    can be any iterable and the dataset is never kept in memory as a whole.
+    The generator returns the (msg_id, key_id) of the last test vector,
+    available as the value of a `yield from` expression.
     """
-    dataset = []
-    key = ""
-    npub = ""
-    nsec = ""
-    ad = ""
+    if rng is None:
+        rng = RandomSource()
+    # the last AEAD test vector, whose key is reused (hash test vectors have no key)
+    prev = None
+    msg_id = start_msg_no - 1
+    key = b""
+    npub = b""
+    nsec = b""
+    ad = b""
     new_key = 0
     key_id = start_key_no - 1
 
-    def get_running_value(size):
-        a = ["{:02X}".format(int(i % 256)) for i in range(0, int(size))]
-        return "".join(a)
-
     # print(routine)
     for i, tv in enumerate(routine):
         hashop = tv[4]
@@ -1038,114 +1499,125 @@ def gen_dataset(opts, routine, start_msg_no, start_key_no, mode=0):
         if hashop:
             new_key = 0
             decrypt = False
-            key = npub = nsec = ad = []
+            key = npub = nsec = ad = b""
         else:
-            new_key = 1 if i == 0 else tv[0]
+            new_key = 1 if prev is None else tv[0]
             decrypt = tv[1]
 
+        # Deterministic payloads are cached, so that equal inputs are also the
+        # same objects (with cached hashes) for the memo of library outputs
         if mode == 2:
             if not hashop:
-                key = get_running_value(opts.key_size // 8)
-                npub = get_running_value(opts.npub_size // 8)
-                nsec = get_running_value(opts.nsec_size // 8)
-                ad = get_running_value(tv[2])
-            data = get_running_value(tv[3])
+                key = running_data(opts.key_size // 8)
+                npub = running_data(opts.npub_size // 8)
+                nsec = running_data(opts.nsec_size // 8)
+                ad = running_data(int(tv[2]))
+            data = running_data(int(tv[3]))
 
         elif mode == 1:
             if not hashop:
-                key = "55" * (opts.key_size // 8)
-                npub = "B0" * (opts.npub_size // 8)
-                nsec = "66" * (opts.nsec_size // 8)
-                ad = "A0" * tv[2]
-            data = "FF" * tv[3]
+                key = constant_data(opts.key_size // 8, 0x55)
+                npub = constant_data(opts.npub_size // 8, 0xB0)
+                nsec = constant_data(opts.nsec_size // 8, 0x66)
+                ad = constant_data(tv[2], 0xA0)
+            data = constant_data(tv[3], 0xFF)
 
         else:
             if not hashop:
-                key = gen_data(opts.key_size // 8, mode, "55")
-                npub = gen_data(opts.npub_size // 8, mode, "B0")
-                nsec = gen_data(opts.nsec_size // 8, mode, "66")
-                ad = gen_data(tv[2], mode, "A0")
-            data = gen_data(tv[3], mode, "FF")
+                key = gen_data(opts.key_size // 8, mode, 0x55, rng)
+                npub = gen_data(opts.npub_size // 8, mode, 0xB0, rng)
+                nsec = gen_data(opts.nsec_size // 8, mode, 0x66, rng)
+                ad = gen_data(tv[2], mode, 0xA0, rng)
+            data = gen_data(tv[3], mode, 0xFF, rng)
 
         if new_key == 0 and not hashop:
-            key = dataset[i - 1].key
+            key = prev.key
             #! Automatically use old value for decryption
             #! if the same key is used for the same ad and plaintext size
             if (
                 decrypt
-                and not dataset[i - 1].decrypt
-                and tv[2] == lenbytes(dataset[i - 1].ad)
-                and tv[3] == lenbytes(dataset[i - 1].pt)
+                and not prev.decrypt
+                and tv[2] == len(prev.ad)
+                and tv[3] == len(prev.pt)
             ):
-                npub = dataset[i - 1].npub
-                nsec = dataset[i - 1].nsec_pt
-                ad = dataset[i - 1].ad
-                data = dataset[i - 1].pt
+                npub = prev.npub
+                nsec = prev.nsec_pt
+                ad = prev.ad
+                data = prev.pt
 
         if not hashop:
             key_id = key_id + new_key
             if key_id < 0:
                 key_id = 0
 
-        dataset.append(
-            TestVector(
-                opts,
-                i + start_msg_no,
-                key_id,
-                new_key,
-                decrypt,
-                key,
-                npub,
-                nsec,
-                ad,
-                data,
-                hashop,
-            )
+        msg_id = i + start_msg_no
+        vector = TestVector(
+            opts,
+            msg_id,
+            key_id,
+            new_key,
+            decrypt,
+            key,
+            npub,
+            nsec,
+            ad,
+            data,
+            hashop,
         )
-    return dataset, i + start_msg_no, key_id
+        if not hashop:
+            prev = vector
+        yield vector
+    return msg_id, key_id
 
 
 def gen_single(opts, start_msg_no, start_key_no, index):
     if opts.verbose:
         print("gen_single")
-    dataset = []
     decrypt = True if opts.gen_single[index][0] == 1 else False
     hashop = True if opts.gen_single[index][0] == 2 else False
     new_key = not hashop
-    dataset.append(
-        TestVector(
-            opts,
-            start_msg_no,
-            start_key_no,
-            new_key,
-            decrypt,
-            opts.gen_single[index][1],
-            opts.gen_single[index][2],
-            opts.gen_single[index][3],
-            opts.gen_single[index][4],
-            opts.gen_single[index][5],
-            hashop,
-        )
+    # KEY, NPUB, NSEC, and AD are ignored in HASH mode
+    (key, npub, nsec, ad) = (
+        [b""] * 4
+        if hashop
+        else [bytes.fromhex(v) for v in opts.gen_single[index][1:5]]
+    )
+    yield TestVector(
+        opts,
+        start_msg_no,
+        start_key_no,
+        new_key,
+        decrypt,
+        key,
+        npub,
+        nsec,
+        ad,
+        bytes.fromhex(opts.gen_single[index][5]),
+        hashop,
     )
     if hashop:
         start_key_no = start_key_no - 1
-    return dataset, start_msg_no, start_key_no
+    return start_msg_no, start_key_no
 
 
-def gen_random(opts, start_msg_no, start_key_no):
+def gen_random(opts, start_msg_no, start_key_no, rng=None):
     if opts.verbose:
         print("gen_random")
-    routine = []
-    for _ in range(opts.gen_random):
-        new_key = random.randrange(2)
-        operation = random.randrange(2)
-        sizeAd = random.randrange(opts.min_ad, opts.max_ad + 1)
-        sizeMsg = random.randrange(opts.min_d, opts.max_d + 1)
-        routine.append([new_key, operation, sizeAd, sizeMsg, False])
-    return gen_dataset(opts, routine, start_msg_no, start_key_no, 0)
+    if rng is None:
+        rng = RandomSource()
+
+    def routine():
+        for _ in range(opts.gen_random):
+            new_key = rng.randrange(2)
+            operation = rng.randrange(2)
+            sizeAd = rng.randrange(opts.min_ad, opts.max_ad + 1)
+            sizeMsg = rng.randrange(opts.min_d, opts.max_d + 1)
+            yield [new_key, operation, sizeAd, sizeMsg, False]
+
+    return gen_dataset(opts, routine(), start_msg_no, start_key_no, 0, rng)
 
 
-def gen_test_combined(opts, start_msg_no, key_no):
+def gen_test_combined(opts, start_msg_no, key_no, rng=None):
     if opts.verbose:
         print("gen_test_combined")
     bsa = opts.block_size_ad if opts.block_size_ad != None else opts.block_size
@@ -1189,10 +1661,12 @@ def gen_test_combined(opts, start_msg_no, key_no):
         [False, True, 0, bsd * 3, True],
     ]
 
-    return gen_dataset(opts, routine[start - 1 : stop], start_msg_no, key_no, mode)
+    return gen_dataset(
+        opts, routine[start - 1 : stop], start_msg_no, key_no, mode, rng
+    )
 
 
-def gen_hash(opts, start_msg_no):
+def gen_hash(opts, start_msg_no, rng=None):
     if opts.verbose:
         print("gen_hash")
     bsd = opts.block_size // 8 if opts.block_size else 16
@@ -1222,10 +1696,10 @@ def gen_hash(opts, start_msg_no):
         [False, False, 0, bsd * 5 + 1, True],
     ]
 
-    return gen_dataset(opts, routine[start - 1 : stop], start_msg_no, 0, mode)
+    return gen_dataset(opts, routine[start - 1 : stop], start_msg_no, 0, mode, rng)
 
 
-def gen_test_routine(opts, start_msg_no, start_key_no):
+def gen_test_routine(opts, start_msg_no, start_key_no, rng=None):
     if not opts.block_size:
         opts.block_size = 128
         log.warn(
@@ -1260,28 +1734,384 @@ def gen_test_routine(opts, start_msg_no, start_key_no):
         (False, True, bsa * 5, bsd * 5, False),
     ]
     return gen_dataset(
-        opts, routine[start - 1 : stop], start_msg_no, start_key_no, mode
+        opts, routine[start - 1 : stop], start_msg_no, start_key_no, mode, rng
     )
 
 
+def gen_vectors(opts, rng=None):
+    """Test vectors of all routines in `opts.routines` (except gen_benchmark), in order
+
+    Message and key IDs continue from one routine to the next.
+    """
+    msg_no = 1
+    key_no = 1
+    gen_single_index = 0
+
+    for routine in opts.routines:
+        if routine == 0:
+            data = gen_random(opts, msg_no, key_no, rng)
+        elif routine == 1:
+            data = gen_dataset(
+                opts, opts.gen_custom, msg_no, key_no, opts.gen_custom_mode, rng
+            )
+        elif routine == 2:
+            data = gen_test_routine(opts, msg_no, key_no, rng)
+        elif routine == 3:  # Single
+            data = gen_single(opts, msg_no, key_no, gen_single_index)
+            gen_single_index += 1
+        elif routine == 4:  # Hash
+            data = gen_hash(opts, msg_no, rng)
+        elif routine == 5:  # Combined AEAD and Hash
+            data = gen_test_combined(opts, msg_no, key_no, rng)
+
+        (last_msg_no, last_key_no) = yield from data
+        msg_no = last_msg_no + 1
+        key_no = last_key_no + 1
+
+
+def uses_random_data(opts) -> bool:
+    """Whether any routine of `opts.routines` draws from the random number
+    generator (and depends on `--seed`)
+
+    gen_single, and the other routines with a MODE other than 0 (random data),
+    generate the same test vectors on each run.
+    """
+    for routine in getattr(opts, "routines", ()):
+        if routine in (0, 6):  # gen_random, gen_benchmark
+            return True
+        if routine == 1 and opts.gen_custom_mode == 0:
+            return True
+        if routine == 2 and opts.gen_test_routine[2] == 0:
+            return True
+        if routine == 4 and opts.gen_hash[2] == 0:
+            return True
+        if routine == 5 and opts.gen_test_combined[2] == 0:
+            return True
+    return False
+
+
+def get_batch_func(lib, hashop):
+    """The batch function of `lib`, or None if the library was built without it"""
+    try:
+        return lib.lwc_batch_crypto_hash if hashop else lib.lwc_batch_aead_encrypt
+    except AttributeError:
+        return None
+
+
+def batch_aead_encrypt(func, tvs):
+    """Encrypt `tvs` in one library call, returns the output of each test vector"""
+    ffi = get_ffi()
+    opts = tvs[0].opts
+    buf = TestVector.BUFFER
+    parts = []
+    desc = []
+    out_desc = []
+    pos = 0
+    out_size = 0
+    for tv in tvs:
+        for data in (tv.key, tv.npub, tv.nsec_pt):
+            desc.append(pos)
+            parts.append(data)
+            pos += len(data)
+        for data in (tv.ad, tv.pt):
+            # add buffer to prevent overflow
+            desc += [pos, len(data)]
+            parts += [data, buf]
+            pos += len(data) + len(buf)
+        out_desc += [out_size, 0]
+        out_size += len(tv.pt) + len(buf)
+    in_ = ffi.from_buffer(b"".join(parts))
+    desc = ffi.new("unsigned long long[]", desc)
+    out = scratch.get("out", out_size)
+    out_desc = ffi.new("unsigned long long[]", out_desc)
+    with profiler.timer("aead_encrypt", len(tvs)):
+        func(len(tvs), in_, desc, opts.nsec_size > 0, out, out_desc)
+    output = cdata_bytes(out, out_size)
+    return [
+        output[out_desc[2 * i] : out_desc[2 * i] + out_desc[2 * i + 1]]
+        for i in range(len(tvs))
+    ]
+
+
+def batch_crypto_hash(func, tvs):
+    """Hash `tvs` in one library call, returns the digest of each test vector"""
+    ffi = get_ffi()
+    buf = TestVector.BUFFER
+    parts = []
+    desc = []
+    out_off = []
+    pos = 0
+    out_size = 0
+    for tv in tvs:
+        # add buffer to prevent overflow
+        desc += [pos, len(tv.pt)]
+        parts += [tv.pt, buf]
+        pos += len(tv.pt) + len(buf)
+        out_off.append(out_size)
+        out_size += max(len(tv.pt), tv.hash_tag_size) + len(buf)
+    in_ = ffi.from_buffer(b"".join(parts))
+    desc = ffi.new("unsigned long long[]", desc)
+    out = scratch.get("out", out_size)
+    with profiler.timer("crypto_hash", len(tvs)):
+        func(len(tvs), in_, desc, out, ffi.new("unsigned long long[]", out_off))
+    output = cdata_bytes(out, out_size)
+    return [output[off : off + tv.hash_tag_size] for off, tv in zip(out_off, tvs)]
+
+
+def compute_tvs(tvs):
+    """Compute the outputs of `tvs`
+
+    Outputs are looked up in the `memo` (and with `--result_store` in the
+    persistent `ResultStore`) first, and test vectors with the same inputs are
+    computed only once. The remaining test vectors of the same library are
+    computed in a single call to its batch function, if the library provides
+    one. Otherwise (e.g., libraries built by an older version of cryptotvgen)
+    each test vector is computed on its own.
+    """
+    groups = {}
+    for tv in tvs:
+        if tv.computed:
+            continue
+        key = tv.memo_key()
+        output = memo.get(key)
+        if output is not None:
+            profiler.count("memo_hit")
+            tv.compute(output)
+        else:
+            group = groups.setdefault((id(tv.lib), tv.hashop), {})
+            group.setdefault(key, []).append(tv)
+    if not groups:
+        return
+    opts = tvs[0].opts
+    use_store = getattr(opts, "result_store", False)
+    for (_, hashop), group in groups.items():
+        if use_store:
+            lib = lib_digest(opts, hashop)
+            digests = {key: inputs_digest(key[1:]) for key in group}
+            with profiler.timer("result_store"):
+                found = get_result_store().get_many(lib, list(digests.values()))
+            for key in list(group):
+                output = found.get(digests[key])
+                if output is not None:
+                    profiler.count("result_store_hit")
+                    memo.put(key, output)
+                    for tv in group.pop(key):
+                        tv.compute(output)
+            if not group:
+                continue
+        first = [same[0] for same in group.values()]
+        func = get_batch_func(first[0].lib, hashop) if len(first) > 1 else None
+        if func is None:
+            outputs = [tv.library_output() for tv in first]
+        elif hashop:
+            outputs = batch_crypto_hash(func, first)
+        else:
+            outputs = batch_aead_encrypt(func, first)
+        for (key, same), output in zip(group.items(), outputs):
+            memo.put(key, output)
+            for tv in same:
+                tv.compute(output)
+        if use_store:
+            with profiler.timer("result_store"):
+                get_result_store().put_many(
+                    lib, [(digests[key], output) for key, output in zip(group, outputs)]
+                )
+
+
+def verify_tvs(tvs):
+    """Compute (if needed) and verify the sampled test vectors of `tvs`
+    (`--verify_lib full`) in a worker process
+
+    Returns the number of verified test vectors and the stages of the
+    profiler of the worker (see `Profiler.take`).
+    """
+    compute_tvs(tvs)
+    verified = [tv for tv in tvs if tv.is_verified()]
+    for tv in verified:
+        tv.verify()
+    return len(verified), profiler.take()
+
+
+def render_tv(tv, out):
+    """Compute a test vector and write its text to `out`"""
+    with profiler.timer("gen_tv"):
+        tv.gen_tv(out)
+    with profiler.timer("gen_nist_tv"):
+        tv.gen_nist_tv(out)
+    with profiler.timer("gen_cc_hls"):
+        tv.gen_cc_hls(out)
+
+
+def render_tvs_blocks(tvs):
+    """Compute test vectors in a worker process
+
+    Returns the rendered (file_name, text) blocks of each test vector, their
+    results with `--verify_lib full` (None otherwise), and the stages of the
+    profiler of the worker (see `Profiler.take`).
+    """
+    compute_tvs(tvs)
+    rendered = []
+    for tv in tvs:
+        out = TextBlocks()
+        render_tv(tv, out)
+        rendered.append(out.blocks)
+    results = None
+    if tvs and getattr(tvs[0].opts, "verify_lib", False) == "full":
+        # the `TVVerifier` verifies the outputs that are written
+        results = [tv.result for tv in tvs]
+    return rendered, results, profiler.take()
+
+
+BATCH_SIZE = 16
+
+
+class TVVerifier:
+    """Verifies test vectors in a separate pool of worker processes,
+    concurrently with rendering (`--verify_lib full`)
+
+    Without `--verify_lib full`, submitted test vectors are ignored: they are
+    verified inline when they are computed (if `--verify_lib` is set).
+    """
+
+    def __init__(self, opts):
+        self.pool = None
+        self.pending = deque()
+        self.verified = 0
+        if getattr(opts, "verify_lib", False) == "full":
+            import multiprocessing
+
+            self.processes = getattr(opts, "jobs", 1)
+            self.pool = multiprocessing.Pool(
+                self.processes, initializer=init_worker, initargs=(opts,)
+            )
+
+    def submit(self, tvs):
+        if self.pool is None:
+            return
+        self.pending.append(self.pool.apply_async(verify_tvs, (tvs,)))
+        # collect finished results, and bound the number of batches in flight
+        while self.pending and (
+            self.pending[0].ready() or len(self.pending) > 16 * self.processes
+        ):
+            self.collect()
+
+    def collect(self):
+        """Wait for the oldest pending batch"""
+        (verified, stats) = self.pending.popleft().get()
+        self.verified += verified
+        profiler.merge(stats)
+
+    def close(self):
+        if self.pool is None:
+            return
+        while self.pending:
+            self.collect()
+        self.pool.close()
+        self.pool.join()
+        log.info("Verified %d test vectors with --verify_lib full", self.verified)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+
+
 def gen_tv_and_write_files(opts, dataset):
     """This utility function takes the dataset and generates the test vectors and
     writes then to the appropriate files
+
+    With `opts.jobs` other than 1, test vectors are computed and rendered in a
+    pool of worker processes. Results are written in the order of the dataset,
+    so the generated files are identical to those of a serial run.
+
+    With `--verify_lib full`, test vectors are verified by a `TVVerifier`.
     """
     if not os.path.exists(opts.dest):
         os.makedirs(opts.dest, exist_ok=True)
 
-    print_header(opts)
-    for tv in dataset:
-        tv.gen_tv()
-        tv.gen_nist_tv()
-        tv.gen_cc_hls()
+    chunk_size = getattr(opts, "chunk_size", None)
+    if chunk_size:
+        dataset = start_chunks_with_new_key(dataset, chunk_size)
+    dataset = profiler.timed_iter("gen_dataset", dataset)
+    jobs = getattr(opts, "jobs", 1)
+    # Test vectors are computed in batches of BATCH_SIZE (see `compute_tvs`)
+    batches = iter(lambda: list(itertools.islice(dataset, BATCH_SIZE)), [])
+    with TVWriter(opts) as out, TVVerifier(opts) as verifier:
+        if jobs == 1:
+            n = 0
+            for batch in batches:
+                compute_tvs(batch)
+                for tv in batch:
+                    if chunk_size and n and n % chunk_size == 0:
+                        out.next_chunk()
+                    render_tv(tv, out)
+                    n += 1
+                verifier.submit(batch)
+        else:
+            import multiprocessing
+
+            batches = snapshot_opts(batches, opts)
+            with multiprocessing.Pool(
+                jobs, initializer=init_worker, initargs=(opts,)
+            ) as pool:
+                # Feed the pool one window of batches at a time, so that only a bounded
+                # number of test vectors are in flight when `dataset` is a (long) generator
+                window_size = 4 * jobs
+                windows = iter(lambda: list(itertools.islice(batches, window_size)), [])
+
+                def rendered():
+                    for window in windows:
+                        for batch, (blocks, results, stats) in zip(
+                            window, pool.imap(render_tvs_blocks, window)
+                        ):
+                            profiler.merge(stats)
+                            if results is not None:
+                                for tv, result in zip(batch, results):
+                                    tv.result = result
+                                verifier.submit(batch)
+                            yield from blocks
+
+                for n, blocks in enumerate(rendered()):
+                    if chunk_size and n and n % chunk_size == 0:
+                        out.next_chunk()
+                    for file_name, txt in blocks:
+                        out.write(file_name, txt)
+
+
+def snapshot_opts(batches, opts):
+    """Give the test vectors of each batch a copy of `opts` as they are when the
+    batch is generated
+
+    Routines may change `opts` while the dataset is generated (e.g. the default
+    `block_size` of `gen_test_routine`), after a batch is generated but before it
+    is pickled for a worker process. A serial run renders each batch with the
+    options of that time. The copy is pickled once per batch.
+    """
+    for batch in batches:
+        batch_opts = copy.copy(opts)
+        for tv in batch:
+            tv.opts = batch_opts
+        yield batch
+
 
-    # Add EOF tag
-    for file_name in [opts.pdi_file, opts.do_file, opts.sdi_file]:
-        file_path = os.path.join(opts.dest, file_name)
-        with open(file_path, "a") as f:
-            f.write("###EOF\n")
+def start_chunks_with_new_key(dataset, chunk_size):
+    """Activate a new key in the first AEAD test vector of every chunk of
+    `chunk_size` test vectors (which may follow hash test vectors), so that each
+    chunk can be used on its own. Msg and key IDs are not changed.
+    """
+    key_activated = True
+    for n, tv in enumerate(dataset):
+        if n % chunk_size == 0:
+            key_activated = False
+        if not key_activated and not tv.hashop:
+            tv.new_key = 1
+            key_activated = True
+        yield tv
 
 
 def determine_params(opts):
@@ -1350,7 +2180,7 @@ def determine_params(opts):
                         opts[opt_attr] = v
 
 
-def blanket_tests(opts, reuse_key=None):
+def blanket_tests(opts, reuse_key=None, rng=None):
     aead_routine = []
     hash_routine = []
     ad_bs = opts.block_size_ad // 8 if opts.block_size_ad is not None else 0
@@ -1360,6 +2190,8 @@ def blanket_tests(opts, reuse_key=None):
     )
     if reuse_key is None:
         reuse_key = opts.aead and opts.with_key_reuse
+    if rng is None:
+        rng = RandomSource()
     if opts.aead:
         msg_sizes = [
             0,
@@ -1426,14 +2258,14 @@ def blanket_tests(opts, reuse_key=None):
     routine = aead_routine + hash_routine
     if opts.random_shuffle:
         log.info("shuffling testvectors")
-        random.shuffle(routine)
+        rng.shuffle(routine)
     if reuse_key:
         for i in range(1, len(routine)):
             if (
                 routine[i][4] == False and routine[i - 1][4] == False
             ):  # consequetive enc/dec
                 routine[i][0] = bool(
-                    random.randint(0, 1)
+                    rng.randint(0, 1)
                 )  # set new key for some testvectors to 0
         msg_sizes = [
             0,
@@ -1461,7 +2293,7 @@ def blanket_tests(opts, reuse_key=None):
             for ad_size in ad_sizes
         ]
         if opts.random_shuffle:
-            random.shuffle(aead_reuse_key_routine)
+            rng.shuffle(aead_reuse_key_routine)
         routine += aead_reuse_key_routine
     log.debug(f"blanket_tests: generated {len(routine)} testvectors")
     return routine
@@ -1542,7 +2374,7 @@ def timing_tests(opts, n=4, m=None):
     return [r[0:-1] for r in ret]
 
 
-def gen_benchmark_routine(opts):
+def gen_benchmark_routine(opts, rng=None):
     if opts.verbose:
         print("gen_benckmark_routine")
     if not opts.aead or not opts.block_size or not opts.block_size_ad:
@@ -1563,13 +2395,13 @@ def gen_benchmark_routine(opts):
     orig_dest = opts.dest
 
     opts.dest = os.path.join(orig_dest, "kats_for_verification")
-    data, _, _ = gen_dataset(opts, blanket_tests(opts), 1, 1)
+    data = gen_dataset(opts, blanket_tests(opts, rng=rng), 1, 1, rng=rng)
     print(f"Generating {os.path.abspath(opts.dest)}")
     gen_tv_and_write_files(opts, data)
 
     opts.dest = os.path.join(orig_dest, "timing_tests")
     print(f"Generating {os.path.abspath(opts.dest)}")
-    data, _, _ = gen_dataset(opts, timing_tests(opts), 1, 1)
+    data = gen_dataset(opts, timing_tests(opts), 1, 1, rng=rng)
     gen_tv_and_write_files(opts, data)
 
     opts.dest = orig_dest
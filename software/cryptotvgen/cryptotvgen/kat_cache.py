@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Cache of generated test vectors
+
+A generated output directory is stored under `~/.cryptotvgen/cache/<key>`,
+where `<key>` is a hash of everything that determines its content: the
+parameter header (all normalized options including the seed and the version of
+cryptotvgen), the routines and their arguments, the output file names, and the
+contents of the AEAD and hash libraries.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from .generator import get_header, lib_digest, uses_random_data
+from .options import routines
+from .prepare_libs import ctgen_get_dir
+
+log = logging.getLogger(__name__)
+
+__all__ = ["cacheable", "cache_key", "cache_lookup", "cache_store", "copy_tree"]
+
+# options which are not part of the header but change the generated files
+OUTPUT_OPTS = (
+    "routines",
+    *routines,
+    "pdi_file",
+    "sdi_file",
+    "do_file",
+    "human_readable",
+    "chunk_size",
+    "binary_kat",
+)
+
+
+def cacheable(opts) -> bool:
+    """Test vectors can only be reused if they are reproducible"""
+    if not uses_random_data(opts):
+        return True
+    return opts.seed is not None and opts.data_source != "urandom"
+
+
+def cache_key(opts) -> str:
+    """Key of the test vectors generated with `opts`"""
+    h = hashlib.sha256(get_header(opts).encode())
+    for opt in OUTPUT_OPTS:
+        h.update(f"{opt}={getattr(opts, opt, None)!r}\n".encode())
+    if opts.aead:
+        h.update(f"aead={lib_digest(opts, False)}\n".encode())
+    if opts.hash:
+        h.update(f"hash={lib_digest(opts, True)}\n".encode())
+    return h.hexdigest()
+
+
+def cache_lookup(key) -> Optional[Path]:
+    """Return the cached output directory of `key`, if any"""
+    entry = ctgen_get_dir("cache") / key
+    return entry if entry.is_dir() else None
+
+
+def cache_staging_dir() -> Path:
+    """A new temporary directory in the cache to generate test vectors into"""
+    return Path(tempfile.mkdtemp(prefix=".staging-", dir=ctgen_get_dir("cache")))
+
+
+def cache_store(key, staging_dir) -> Path:
+    """Move the complete output directory `staging_dir` to the entry of `key`"""
+    entry = ctgen_get_dir("cache") / key
+    try:
+        os.replace(staging_dir, entry)
+        log.info("Stored test vectors in cache: %s", entry)
+    except OSError:
+        # entry was stored concurrently by another run
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    return entry
+
+
+def copy_tree(src, dst):
+    """Copy the content of directory `src` into `dst`, overwriting existing files"""
+    for root, _, files in os.walk(src):
+        out_dir = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(out_dir, exist_ok=True)
+        for f in files:
+            shutil.copyfile(os.path.join(root, f), os.path.join(out_dir, f))
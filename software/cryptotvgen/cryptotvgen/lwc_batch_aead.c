@@ -0,0 +1,36 @@
+/*
+ * Batch interface of an AEAD library, compiled into each `crypto_aead` variant
+ * by `lwc_cffi.mk`, so that cryptotvgen can encrypt many test vectors in a
+ * single foreign function call.
+ */
+
+#include <stddef.h>
+
+#include "crypto_aead.h"
+
+/*
+ * Encrypt `n` test vectors.
+ *
+ * All inputs are packed in `in`. For test vector `i`, `desc[7 * i ...]` holds
+ * the offsets of key, npub, nsec, and ad, the length of ad, and the offset and
+ * length of the message. nsec is passed as NULL if `with_nsec` is zero.
+ *
+ * The ciphertext of test vector `i` is written to `out + out_desc[2 * i]` and
+ * its length is stored in `out_desc[2 * i + 1]`.
+ */
+int lwc_batch_aead_encrypt(unsigned long long n, const unsigned char *in,
+                           const unsigned long long *desc, int with_nsec,
+                           unsigned char *out, unsigned long long *out_desc)
+{
+    unsigned long long i;
+    const unsigned long long *d;
+
+    for (i = 0; i < n; i++)
+    {
+        d = desc + 7 * i;
+        crypto_aead_encrypt(out + out_desc[2 * i], &out_desc[2 * i + 1],
+                            in + d[5], d[6], in + d[3], d[4],
+                            with_nsec ? in + d[2] : NULL, in + d[1], in + d[0]);
+    }
+    return 0;
+}
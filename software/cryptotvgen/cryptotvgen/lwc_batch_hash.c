@@ -0,0 +1,26 @@
+/*
+ * Batch interface of a hash library, compiled into each `crypto_hash` variant
+ * by `lwc_cffi.mk`, so that cryptotvgen can hash many test vectors in a single
+ * foreign function call.
+ */
+
+#include "crypto_hash.h"
+
+/*
+ * Hash `n` messages.
+ *
+ * All messages are packed in `in`. For message `i`, `desc[2 * i]` is its offset
+ * and `desc[2 * i + 1]` its length. The digest is written to `out + out_off[i]`.
+ */
+int lwc_batch_crypto_hash(unsigned long long n, const unsigned char *in,
+                          const unsigned long long *desc, unsigned char *out,
+                          const unsigned long long *out_off)
+{
+    unsigned long long i;
+
+    for (i = 0; i < n; i++)
+    {
+        crypto_hash(out + out_off[i], in + desc[2 * i], desc[2 * i + 1]);
+    }
+    return 0;
+}
@@ -37,6 +37,8 @@ IMPL_SRC_DIR?=ref
 IMPL_SRC_PATH=$(CANDIDATE_PATH)/$(CRYPTO_DIR)/$(CRYPTO_VARIANT)/$(IMPL_SRC_DIR)
 
 C_SRCS=$(wildcard $(IMPL_SRC_PATH)/*.c)
+# batch interface used by cryptotvgen (optional)
+C_SRCS+=$(wildcard $(BASE_DIR)/lwc_batch_$(CRYPTO_TYPE).c)
 C_HDRS=$(wildcard $(IMPL_SRC_PATH)/*.h) $(wildcard $(INCLUDES_DIR)/*.h)
 
 LIB_PATH ?= $(CANDIDATE_PATH)/lib
@@ -85,12 +85,12 @@ class ValidateGenRandom(argparse.Action):
         if args.hash is not None:
             sys.exit("`--gen_random` can only be used in for AEAD test vectors")
 
-        if values < 1 or values > 1000:
+        if values < 1:
             raise argparse.ArgumentError(
                 self,
                 textwrap.dedent(
                     """\
-                Number of test has to between 1 and 1000: {s!r}""".format(
+                Number of test has to be at least 1: {s!r}""".format(
                         s=values
                     )
                 ),
@@ -106,6 +106,41 @@ class ValidateGenRandom(argparse.Action):
         setattr(args, self.dest, values)
 
 
+def check_verify_rate(value):
+    if not 0.0 < value <= 1.0:
+        raise ValueError("Rate has to be in the range (0, 1]: {s!r}".format(s=value))
+
+
+def check_jobs(value):
+    if value < 1:
+        raise ValueError("Number of jobs has to be at least 1: {s!r}".format(s=value))
+
+
+def check_chunk_size(value):
+    if value < 1:
+        raise ValueError("Chunk size has to be at least 1: {s!r}".format(s=value))
+
+
+# Checks of single option values (raising ValueError), used by the parser and
+# by `cli.validate_opts` (for options that are not parsed)
+VALUE_CHECKS = {
+    "verify_lib_rate": check_verify_rate,
+    "jobs": check_jobs,
+    "chunk_size": check_chunk_size,
+}
+
+
+class ValidateValue(argparse.Action):
+    """Validate an option with its check in `VALUE_CHECKS`"""
+
+    def __call__(self, parser, args, values, option_string=None):
+        try:
+            VALUE_CHECKS[self.dest](values)
+        except ValueError as e:
+            raise argparse.ArgumentError(self, str(e))
+        setattr(args, self.dest, values)
+
+
 class ValidatePrepareLibs(argparse.Action):
     def __init__(self, option_strings, dest, nargs, **kwargs):
         super(ValidatePrepareLibs, self).__init__(option_strings, dest, nargs, **kwargs)
@@ -386,6 +421,9 @@ class CustomFormatter(
 
 
 def get_parser():
+    # imported here, as the generator imports `routines` from this module
+    from .generator import RandomSource
+
     parser = argparse.ArgumentParser(
         add_help=False,
         formatter_class=CustomFormatter,
@@ -490,7 +528,10 @@ def get_parser():
         help=textwrap.dedent(
             """\
             Randomly generates N test vectors with
-            varying AD_LEN, PT_LEN, and operation (For use only with AEAD)"""
+            varying AD_LEN, PT_LEN, and operation (For use only with AEAD)
+            There is no upper limit on N. Test vectors are generated and
+            written one at a time, so millions of test vectors can be
+            generated. See also `--seed` and `--chunk_size`."""
         ),
     )
     test.add_argument(
@@ -558,6 +599,33 @@ def get_parser():
         """
         ),
     )
+    test.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        metavar="SEED",
+        help=textwrap.dedent(
+            """\
+            Seed of the random number generator. Runs with the same options
+            and seed generate the same test vectors. If not specified, a
+            random seed is chosen when random data is generated. The seed
+            is recorded in the header of the generated files."""
+        ),
+    )
+    test.add_argument(
+        "--data_source",
+        default="random",
+        choices=RandomSource.KINDS,
+        help=textwrap.dedent(
+            """\
+            Source of random test vector data:
+                random  = Mersenne Twister of Python's `random` module
+                numpy   = NumPy's PCG64 generator (requires NumPy),
+                          faster for large messages
+                urandom = operating system's random source (`os.urandom`),
+                          ignores `--seed`"""
+        ),
+    )
     test.add_argument(
         "--random_shuffle",
         default=True,
@@ -879,11 +947,18 @@ def get_parser():
     optops.add_argument(
         "--verify_lib",
         default=False,
-        action="store_true",
+        nargs="?",
+        const="inline",
+        choices=("inline", "full"),
+        metavar="MODE",
         help=textwrap.dedent(
             """\
             This operation will verify the generated test vectors
             via the decryption operation.
+                inline = verify each test vector right after its
+                         encryption (default MODE)
+                full   = verify in a separate pool of worker processes,
+                         concurrently with writing the test vectors
 
             Note: This option provides an additional check against possible
                   mismatch of results between encryption and decryption
@@ -892,6 +967,81 @@ def get_parser():
         ),
     )
 
+    optops.add_argument(
+        "--verify_lib_rate",
+        type=float,
+        default=1.0,
+        action=ValidateValue,
+        metavar="RATE",
+        help=textwrap.dedent(
+            """\
+            Fraction of the encryption test vectors verified by `--verify_lib`.
+            The sample is determined by `--seed` and the message ID, so the
+            same test vectors are verified when a run is repeated.
+            (default: %(default)s)
+            """
+        ),
+    )
+
+    optops.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        action=ValidateValue,
+        metavar="N",
+        help=textwrap.dedent(
+            """\
+            Number of worker processes used for computing and formatting
+            the test vectors.
+            The generated files are identical to a run with `--jobs 1`.
+            """
+        ),
+    )
+
+    optops.add_argument(
+        "--kat_cache",
+        default=False,
+        action="store_true",
+        help=textwrap.dedent(
+            """\
+            Reuse test vectors generated by an earlier run with the same
+            options, seed, and libraries from the cache in
+            `~/.cryptotvgen/cache`, and store newly generated ones there.
+            Requires `--seed` if random data is generated.
+            """
+        ),
+    )
+
+    optops.add_argument(
+        "--result_store",
+        default=False,
+        action="store_true",
+        help=textwrap.dedent(
+            """\
+            Keep the outputs of the AEAD and hash libraries in a database in
+            `~/.cryptotvgen/cache`, keyed by the library file and the inputs,
+            and reuse them in later runs instead of calling the library.
+            """
+        ),
+    )
+
+    optops.add_argument(
+        "--profile",
+        nargs="?",
+        const=True,
+        default=False,
+        metavar="JSON",
+        help=textwrap.dedent(
+            """\
+            Time the stages of the generation (data generation, library
+            calls, verification, formatting, and file writes) and print a
+            summary table. If JSON is given, the timers and counters are also
+            written to this file.
+            """
+        ),
+    )
+
     optops.add_argument(
         "-V", "--version", action="version", version=f"%(prog)s {__version__}"
     )
@@ -1210,6 +1360,33 @@ def get_parser():
     tvops.add_argument(
         "--do_file", default="do.txt", metavar="FILENAME", help="Data output filename"
     )
+    tvops.add_argument(
+        "--chunk_size",
+        type=int,
+        default=None,
+        action=ValidateValue,
+        metavar="COUNT",
+        help=textwrap.dedent(
+            """\
+            Split the output into files of at most COUNT test vectors each,
+            e.g. pdi_0000.txt, pdi_0001.txt, ... (same for all other files).
+            Every chunk starts with a new key, so that each chunk can be
+            simulated on its own. MsgID and KeyID numbering continues
+            across chunks."""
+        ),
+    )
+    tvops.add_argument(
+        "--binary_kat",
+        default=False,
+        action="store_true",
+        help=textwrap.dedent(
+            """\
+            Also write the PDI, SDI, and DO files in a compact binary format
+            (pdi.bin, sdi.bin, and do.bin), which can be memory-mapped by
+            post-processing tools. Use `cryptotvgen-binkat` to convert them
+            to the text format."""
+        ),
+    )
     tvops.add_argument(
         "--dest",
         metavar="PATH_TO_DEST",
@@ -3,13 +3,10 @@ from pathlib import Path
 import sys
 import logging
 import re
-import tarfile
-import urllib.request
 import tempfile
 import pathlib
 import shutil
 import subprocess
-import requests
 
 
 log = logging.getLogger(__name__)
@@ -99,9 +96,13 @@ lwc_candidates = {
 }
 
 mkfile_name = "lwc_cffi.mk"
+batch_src_names = ["lwc_batch_aead.c", "lwc_batch_hash.c"]
 
 
 def get_latest_supercop_version_url(sc_version):
+    # imported here, as it is only needed for downloading SUPERCOP and slow to import
+    import requests
+
     sc_base_url = "https://bench.cr.yp.to/"
     sc_page_url = sc_base_url + "supercop.html"
 
@@ -211,6 +212,9 @@ def prepare_libs(sc_version, libs, candidates_dir, lib_path):
         return variants  # TODO
 
     def get_sc_tar(sc_version):
+        import tarfile
+        import urllib.request
+
         sc_version, sc_url = get_latest_supercop_version_url(sc_version)
         if not sc_url:
             sys.exit(f"Failed to open SUPERCOP archive version: {sc_version}")
@@ -232,9 +236,10 @@ def prepare_libs(sc_version, libs, candidates_dir, lib_path):
     (ctgen_includes_dir / "crypto_aead.h").touch()
     (ctgen_includes_dir / "crypto_hash.h").touch()
 
-    mk_content = pkg_resources.read_text(__package__, mkfile_name)
-    with open(ctgen_mkfile / mkfile_name, "w") as f:
-        f.write(mk_content)
+    for file_name in [mkfile_name] + batch_src_names:
+        content = pkg_resources.read_text(__package__, file_name)
+        with open(ctgen_mkfile / file_name, "w") as f:
+            f.write(content)
 
     variants = set()
 
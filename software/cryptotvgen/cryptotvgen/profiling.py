@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Cumulative timers and counters of the stages of test vector generation (`--profile`)
+
+Stages are timed with `profiler.timer(stage)`, which does nothing unless the
+profiler is enabled. Timers of nested stages overlap, e.g. `build_sgmt` is part
+of `gen_tv`. Stages timed in worker processes (`--jobs`) are merged into the
+profiler of the main process, so their times add up across processes and can
+exceed the wall time of the run.
+"""
+
+import contextlib
+import json
+import time
+
+from .version import __version__
+
+__all__ = ["Profiler", "profiler"]
+
+NULL_TIMER = contextlib.nullcontext()
+
+
+class _Timer:
+    __slots__ = ("stats", "stage", "count", "start")
+
+    def __init__(self, stats, stage, count):
+        self.stats = stats
+        self.stage = stage
+        self.count = count
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        stat = self.stats.setdefault(self.stage, [0, 0.0])
+        stat[0] += self.count
+        stat[1] += elapsed
+
+
+class Profiler:
+    """Cumulative timers and counters of named stages
+
+    `stats` maps each stage to [count, seconds]. Counters (`count`) have no time.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+        self.start = None
+        self.wall_time = 0.0
+
+    def enable(self):
+        """Reset all stages and start profiling"""
+        self.enabled = True
+        self.stats = {}
+        self.start = time.perf_counter()
+        self.wall_time = 0.0
+
+    def disable(self):
+        if self.enabled:
+            self.wall_time = time.perf_counter() - self.start
+        self.enabled = False
+
+    def timer(self, stage, count=1):
+        """Context manager adding its run time and `count` to `stage`"""
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self.stats, stage, count)
+
+    def count(self, stage, count=1):
+        if self.enabled:
+            self.stats.setdefault(stage, [0, 0.0])[0] += count
+
+    def timed_iter(self, stage, iterable):
+        """Iterate over `iterable`, timing the production of each item as `stage`"""
+        if not self.enabled:
+            yield from iterable
+            return
+        it = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            stat = self.stats.setdefault(stage, [0, 0.0])
+            stat[0] += 1
+            stat[1] += time.perf_counter() - start
+            yield item
+
+    def take(self):
+        """Return and reset the stages (of a worker process), None if not enabled"""
+        if not self.enabled:
+            return None
+        stats, self.stats = self.stats, {}
+        return stats
+
+    def merge(self, stats):
+        """Add the stages returned by `take` (in a worker process)"""
+        if not stats:
+            return
+        for stage, (count, seconds) in stats.items():
+            stat = self.stats.setdefault(stage, [0, 0.0])
+            stat[0] += count
+            stat[1] += seconds
+
+    def report(self) -> str:
+        """Summary table of all stages, slowest first"""
+        rows = sorted(self.stats.items(), key=lambda item: item[1][1], reverse=True)
+        lines = [
+            "{:<16} {:>10} {:>12} {:>14}".format(
+                "Stage", "Count", "Total [s]", "Per call [us]"
+            )
+        ]
+        for stage, (count, seconds) in rows:
+            per_call = seconds / count * 1e6 if count and seconds else 0.0
+            lines.append(
+                "{:<16} {:>10} {:>12.4f} {:>14.2f}".format(
+                    stage, count, seconds, per_call
+                )
+            )
+        lines.append("{:<16} {:>10} {:>12.4f}".format("(wall time)", "", self.wall_time))
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        data = {
+            "version": __version__,
+            "wall_time": self.wall_time,
+            "stages": {
+                stage: {"count": count, "seconds": seconds}
+                for stage, (count, seconds) in self.stats.items()
+            },
+        }
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+
+
+profiler = Profiler()
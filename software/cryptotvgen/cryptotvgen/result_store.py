@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent store of library outputs
+
+With `--result_store`, the outputs of the AEAD and hash libraries are kept in
+an SQLite database in `~/.cryptotvgen/cache`, keyed by the SHA-256 of the
+library file and a digest of the inputs, and reused by later runs.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+
+from .prepare_libs import ctgen_get_dir
+
+log = logging.getLogger(__name__)
+
+__all__ = ["ResultStore", "get_result_store"]
+
+DB_NAME = "results.sqlite"
+
+
+def inputs_digest(inputs) -> bytes:
+    """Digest of a tuple of inputs (bytes, ints, and booleans)"""
+    h = hashlib.sha256()
+    for x in inputs:
+        if isinstance(x, bytes):
+            h.update(b"b%d:" % len(x))
+            h.update(x)
+        else:
+            h.update(f"{x!r}:".encode())
+    return h.digest()
+
+
+class ResultStore:
+    """Library outputs in an SQLite database, shared by all runs (and processes)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(str(path), timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "lib TEXT NOT NULL, inputs BLOB NOT NULL, output BLOB NOT NULL, "
+            "PRIMARY KEY (lib, inputs)) WITHOUT ROWID"
+        )
+        self.db.commit()
+
+    def get_many(self, lib, digests):
+        """Outputs of `lib` for the input `digests`, as a dict (missing ones are left out)"""
+        found = {}
+        # stay below SQLite's limit of host parameters
+        for i in range(0, len(digests), 500):
+            part = digests[i : i + 500]
+            rows = self.db.execute(
+                "SELECT inputs, output FROM results WHERE lib = ? AND inputs IN ({})".format(
+                    ",".join("?" * len(part))
+                ),
+                [lib, *part],
+            )
+            found.update((bytes(d), bytes(o)) for d, o in rows)
+        return found
+
+    def put_many(self, lib, items):
+        """Store (input digest, output) `items` of `lib`"""
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO results (lib, inputs, output) VALUES (?, ?, ?)",
+                [(lib, d, o) for d, o in items],
+            )
+
+
+_stores = {}
+
+
+def get_result_store():
+    """The result store of this process (SQLite connections can not be shared
+    with forked worker processes)"""
+    pid = os.getpid()
+    store = _stores.get(pid)
+    if store is None:
+        store = _stores[pid] = ResultStore(ctgen_get_dir("cache") / DB_NAME)
+        log.debug("Opened result store %s", store.path)
+    return store
@@ -1,8 +1,16 @@
-from pkg_resources import get_distribution, DistributionNotFound
+try:
+    from importlib.metadata import PackageNotFoundError, version
+except ImportError:  # Python 3.7
+    from pkg_resources import DistributionNotFound as PackageNotFoundError
+    from pkg_resources import get_distribution
+
+    def version(distribution_name):
+        return get_distribution(distribution_name).version
+
 
 __project__ = "cryptotvgen"
 
 try:
-    __version__ = get_distribution(__project__).version
-except DistributionNotFound:
+    __version__ = version(__project__)
+except PackageNotFoundError:
     __version__ = "(N/A)"
@@ -84,10 +84,11 @@ setup(
     # $ pip install -e .[dev,test]
     extras_require={
         'dev': [],
+        'numpy': ['numpy'],
         # 'test': ['nose'],
     },
     
-    package_data={'cryptotvgen': ['lwc_cffi.mk']},
+    package_data={'cryptotvgen': ['lwc_cffi.mk', 'lwc_batch_aead.c', 'lwc_batch_hash.c']},
     include_package_data=True,
 
     # To provide executable scripts, use entry points in preference to the
@@ -96,6 +97,7 @@ setup(
     entry_points={
         'console_scripts': [
             'cryptotvgen=cryptotvgen:cli.run_cryptotvgen',
+            'cryptotvgen-binkat=cryptotvgen.binkat:main',
         ],
     }
 )
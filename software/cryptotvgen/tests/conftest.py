@@ -0,0 +1,46 @@
+"""
+Fixtures of the cryptotvgen tests
+
+The tests use the `dummy_lwc` reference implementation bundled with this
+repository, and are skipped unless its libraries are built (from
+software/cryptotvgen):
+
+    $ cryptotvgen --prepare_libs --candidates_dir ../dummy_lwc_ref
+"""
+
+from pathlib import Path
+
+import pytest
+
+from cryptotvgen import generator, result_store
+
+candidates_dir = Path(__file__).resolve().parent.parent.parent / "dummy_lwc_ref"
+lib_path = candidates_dir / "lib"
+
+
+@pytest.fixture
+def dummy_lwc():
+    """Options selecting the bundled dummy_lwc AEAD and hash implementations"""
+    for op in ("aead", "hash"):
+        if not (lib_path / f"crypto_{op}" / "dummy_lwc.so").exists():
+            pytest.skip("dummy_lwc libraries are not built (run cryptotvgen --prepare_libs)")
+    return [
+        "--aead", "dummy_lwc",
+        "--candidates_dir", str(candidates_dir),
+        "--lib_path", str(lib_path),
+        "--block_size", "128",
+        "--block_size_ad", "128",
+        "--block_size_msg_digest", "128",
+    ]  # fmt: skip
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """A new home directory, for the cache in `~/.cryptotvgen/cache`"""
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    monkeypatch.setattr(result_store, "_stores", {})
+    generator.memo.clear()
+    yield home
+    generator.memo.clear()
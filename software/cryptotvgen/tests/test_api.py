@@ -0,0 +1,105 @@
+"""
+The in-process API generates the same test vectors as the command line
+"""
+
+import filecmp
+
+import pytest
+
+from cryptotvgen import Generator, cli, render
+from conftest import candidates_dir, lib_path
+
+CASES = {
+    "gen_test_routine": (
+        dict(io=(32, 32), gen_test_routine=(1, 22, 0), seed=1),
+        ["--io", "32", "32", "--gen_test_routine", "1", "22", "0", "--seed", "1"],
+    ),
+    "gen_test_combined": (
+        dict(hash="dummy_lwc", io=(8, 8), gen_test_combined=(1, 20, 0), seed=2),
+        [
+            "--hash", "dummy_lwc",
+            "--io", "8", "8",
+            "--gen_test_combined", "1", "20", "0",
+            "--seed", "2",
+        ],
+    ),
+    "gen_custom": (
+        dict(gen_custom_mode=1, gen_custom=[[1, 0, 5, 5, 0], [0, 1, 0, 7, 0]]),
+        ["--gen_custom_mode", "1", "--gen_custom", "1,0,5,5,0:0,1,0,7,0"],
+    ),
+    "verify_lib_full": (
+        dict(gen_random=20, seed=3, verify_lib="full", human_readable=True),
+        ["--gen_random", "20", "--seed", "3", "--verify_lib", "full", "--human_readable"],
+    ),
+}  # fmt: skip
+
+
+def generator(**options):
+    return Generator(
+        aead="dummy_lwc",
+        candidates_dir=candidates_dir,
+        lib_path=str(lib_path),
+        block_size=128,
+        block_size_ad=128,
+        block_size_msg_digest=128,
+        **options,
+    )
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_write_files_as_cli(tmp_path, dummy_lwc, case):
+    options, args = CASES[case]
+    cli.run_cryptotvgen([*dummy_lwc, *args, "--dest", str(tmp_path / "cli")], logfile=None)
+    generator(**options).write_files(tmp_path / "api")
+    files = sorted(p.name for p in (tmp_path / "cli").iterdir())
+    assert files == sorted(p.name for p in (tmp_path / "api").iterdir())
+    _, mismatch, errors = filecmp.cmpfiles(
+        tmp_path / "cli", tmp_path / "api", files, shallow=False
+    )
+    assert not mismatch and not errors
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_render_as_cli(tmp_path, dummy_lwc, case):
+    options, args = CASES[case]
+    cli.run_cryptotvgen([*dummy_lwc, *args, "--dest", str(tmp_path)], logfile=None)
+    gen = generator(**options)
+    files = render(gen.vectors())
+    assert sorted(files) == sorted(p.name for p in tmp_path.iterdir())
+    for name, text in files.items():
+        assert text and text in (tmp_path / name).read_text()
+    # each call generates the same test vectors
+    assert render(gen.vectors()) == files
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        dict(gen_random=1, ciph_exp_noext=True),
+        dict(gen_random=1, add_partial=True),
+        dict(gen_random=1, hash="dummy_lwc"),
+        dict(gen_random=1, jobs=0),
+        dict(gen_random=1, chunk_size=0),
+        dict(gen_random=1, verify_lib_rate=0.5),
+        dict(gen_random=1, verify_lib=True, verify_lib_rate=1.5),
+        dict(),
+    ],
+    ids=[
+        "ciph_exp_noext",
+        "add_partial",
+        "gen_random_hash",
+        "jobs",
+        "chunk_size",
+        "verify_lib_rate",
+        "verify_lib_rate_range",
+        "no_routine",
+    ],
+)
+def test_invalid_options(dummy_lwc, options):
+    with pytest.raises(ValueError):
+        generator(**options)
+
+
+def test_unknown_option(dummy_lwc):
+    with pytest.raises(TypeError, match="gen_randomly"):
+        generator(gen_randomly=1)
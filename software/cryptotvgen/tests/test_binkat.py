@@ -0,0 +1,49 @@
+"""
+Binary test vector files (`--binary_kat`) convert back to the text files
+"""
+
+import pytest
+
+from cryptotvgen import cli
+from cryptotvgen.binkat import PREFIXES, BinKatReader, to_text
+
+
+def records(path):
+    """The INS/HDR/DAT/STT (and `# TB :`) values of a text test vector file"""
+    return [
+        (line[:6], line[6:].split(" ", 1)[0])
+        for line in path.read_text().splitlines()
+        if line[:6] in PREFIXES
+    ]
+
+
+def generate(dest, *args):
+    cli.run_cryptotvgen([*args, "--seed", "3", "--dest", str(dest)], logfile=None)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--io", "32", "32", "--gen_random", "40", "--max_ad", "100"],
+        ["--io", "8", "8", "--hash", "dummy_lwc", "--gen_test_combined", "1", "33", "0"],
+        ["--io", "16", "16", "--gen_random", "40", "--chunk_size", "15"],
+    ],
+    ids=["io32", "io8_combined", "chunks"],
+)
+def test_round_trip(tmp_path, dummy_lwc, args):
+    generate(tmp_path / "text", *dummy_lwc, *args)
+    generate(tmp_path / "bin", *dummy_lwc, *args, "--binary_kat")
+    bin_files = sorted((tmp_path / "bin").glob("*.bin"))
+    assert len(bin_files) == 3 * len(list((tmp_path / "text").glob("pdi*.txt")))
+    io_width = int(args[1])
+    for bin_file in bin_files:
+        text_file = tmp_path / "text" / bin_file.with_suffix(".txt").name
+        # the text files are the same with and without --binary_kat
+        assert (tmp_path / "bin" / text_file.name).read_text() == text_file.read_text()
+        with BinKatReader(bin_file) as reader:
+            assert reader.width == io_width
+        converted = tmp_path / "converted.txt"
+        to_text(bin_file, converted)
+        assert records(text_file)
+        assert records(converted) == records(text_file)
+        assert converted.read_text().endswith("###EOF\n")
@@ -0,0 +1,63 @@
+"""
+Each chunk of `--chunk_size` test vectors can be used on its own
+"""
+
+import re
+
+import pytest
+
+from cryptotvgen import cli
+
+HASH = ["--hash", "dummy_lwc"]
+
+
+def opcodes(path):
+    return re.findall(r"# Instruction: Opcode=(.*)", path.read_text())
+
+
+def generate(dest, *args):
+    cli.run_cryptotvgen([*args, "--dest", str(dest)], logfile=None)
+    return sorted(dest.glob("pdi_*.txt"))
+
+
+def assert_keys_activated(chunks):
+    for pdi in chunks:
+        aead = [op for op in opcodes(pdi) if op != "Hash"]
+        assert aead, pdi.name
+        assert aead[0] == "Activate Key", pdi.name
+        sdi = pdi.with_name(pdi.name.replace("pdi", "sdi"))
+        assert re.search(r"Key, EOI=1 EOT=1, Last=1, Length=16 bytes", sdi.read_text())
+
+
+def test_chunk_starting_with_hash(tmp_path, dummy_lwc):
+    # the second chunk starts with a hash, followed by an encryption with the old key
+    chunks = generate(
+        tmp_path,
+        *dummy_lwc,
+        *HASH,
+        "--gen_custom", "1,0,5,5,0:0,0,5,5,0:0,0,0,4,1:0,0,5,5,0",
+        "--gen_custom_mode", "1",
+        "--chunk_size", "2",
+    )  # fmt: skip
+    assert len(chunks) == 2
+    assert opcodes(chunks[1])[0] == "Hash"
+    assert_keys_activated(chunks)
+
+
+def test_chunks_of_combined_routine(tmp_path, dummy_lwc):
+    chunks = generate(
+        tmp_path,
+        *dummy_lwc,
+        *HASH,
+        "--gen_test_combined", "1", "33", "0",
+        "--seed", "1",
+        "--chunk_size", "5",
+    )  # fmt: skip
+    assert len(chunks) > 1
+    assert_keys_activated(chunks)
+
+
+@pytest.mark.parametrize("chunk_size", ["0", "-2"])
+def test_chunk_size_at_least_one(tmp_path, dummy_lwc, chunk_size):
+    with pytest.raises(SystemExit):
+        generate(tmp_path, *dummy_lwc, "--gen_random", "1", "--chunk_size", chunk_size)
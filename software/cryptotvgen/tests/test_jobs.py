@@ -0,0 +1,57 @@
+"""
+Test vectors generated with `--jobs N` must be identical to those of a serial run
+"""
+
+import filecmp
+
+import pytest
+
+from cryptotvgen import cli
+from cryptotvgen.options import get_parser
+
+CASES = {
+    "gen_random": ["--gen_random", "100", "--max_ad", "300"],
+    # `gen_test_routine` sets the default `--block_size` while the dataset is generated
+    "gen_test_routine": [
+        "--block_size", "0",
+        "--gen_test_routine", "1", "20", "0",
+        "--max_block_per_sgmt", "1",
+    ],
+    "chunk_size": [
+        "--hash", "dummy_lwc",
+        "--gen_test_routine", "1", "22", "0",
+        "--gen_hash", "1", "21", "0",
+        "--chunk_size", "16",
+    ],
+    "verify_lib_full": ["--gen_random", "100", "--verify_lib", "full"],
+}  # fmt: skip
+
+
+def generate(dest, args, jobs):
+    cli.run_cryptotvgen(
+        [*args, "--seed", "7", "--jobs", str(jobs), "--dest", str(dest)], logfile=None
+    )
+    return sorted(p.name for p in dest.iterdir())
+
+
+@pytest.mark.parametrize("jobs", [2, 3])
+@pytest.mark.parametrize("case", list(CASES))
+def test_parallel_identical_to_serial(tmp_path, dummy_lwc, case, jobs):
+    serial = generate(tmp_path / "serial", [*dummy_lwc, *CASES[case]], 1)
+    parallel = generate(tmp_path / "parallel", [*dummy_lwc, *CASES[case]], jobs)
+    assert serial == parallel
+    _, mismatch, errors = filecmp.cmpfiles(
+        tmp_path / "serial", tmp_path / "parallel", serial, shallow=False
+    )
+    assert not mismatch and not errors
+
+
+def test_chunked_output(tmp_path, dummy_lwc):
+    files = generate(tmp_path, [*dummy_lwc, *CASES["chunk_size"]], 2)
+    assert "pdi_0000.txt" in files and "pdi_0001.txt" in files
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1"])
+def test_jobs_at_least_one(jobs):
+    with pytest.raises(SystemExit):
+        get_parser().parse_args(["--aead", "dummy_lwc", "--gen_random", "1", "--jobs", jobs])
@@ -0,0 +1,89 @@
+"""
+Test vectors of a reproducible run are reused from `--kat_cache`
+"""
+
+import filecmp
+import logging
+
+import pytest
+
+from cryptotvgen import cli
+
+ARGS = ["--gen_random", "20", "--kat_cache"]
+
+
+def generate(dest, *args):
+    cli.run_cryptotvgen([*args, "--dest", str(dest)], logfile=None)
+    return sorted(p.name for p in dest.iterdir())
+
+
+def cache_entries(home):
+    return sorted(p.name for p in (home / ".cryptotvgen" / "cache").iterdir())
+
+
+def test_hit_on_repeated_run(tmp_path, home, monkeypatch, caplog, dummy_lwc):
+    files = generate(tmp_path / "first", *dummy_lwc, *ARGS, "--seed", "5")
+    entries = cache_entries(home)
+    assert len(entries) == 1
+
+    def no_generate(opts):
+        raise AssertionError("test vectors are generated again")
+
+    monkeypatch.setattr(cli, "generate", no_generate)
+    with caplog.at_level(logging.INFO):
+        assert generate(tmp_path / "second", *dummy_lwc, *ARGS, "--seed", "5") == files
+    assert "Using cached test vectors" in caplog.text
+    assert cache_entries(home) == entries
+    _, mismatch, errors = filecmp.cmpfiles(
+        tmp_path / "first", tmp_path / "second", files, shallow=False
+    )
+    assert not mismatch and not errors
+
+
+@pytest.mark.parametrize("changed", [["--seed", "6"], ["--seed", "5", "--max_ad", "10"]])
+def test_miss_on_changed_options(tmp_path, home, dummy_lwc, changed):
+    generate(tmp_path / "first", *dummy_lwc, *ARGS, "--seed", "5")
+    generate(tmp_path / "second", *dummy_lwc, *ARGS, *changed)
+    assert len(cache_entries(home)) == 2
+    assert (tmp_path / "first" / "pdi.txt").read_text() != (
+        tmp_path / "second" / "pdi.txt"
+    ).read_text()
+
+
+def test_warning_without_seed(tmp_path, home, caplog, dummy_lwc):
+    generate(tmp_path, *dummy_lwc, *ARGS)
+    assert "--kat_cache requires --seed" in caplog.text
+    assert not (home / ".cryptotvgen" / "cache").exists() or not cache_entries(home)
+
+
+def test_deterministic_run_without_seed(tmp_path, home, caplog, dummy_lwc):
+    generate(
+        tmp_path,
+        *dummy_lwc,
+        "--gen_custom", "1,0,5,5,0:0,1,0,7,0",
+        "--gen_custom_mode", "1",
+        "--kat_cache",
+    )  # fmt: skip
+    assert "--kat_cache requires --seed" not in caplog.text
+    assert len(cache_entries(home)) == 1
+
+
+def test_no_staging_dir_left_on_error(tmp_path, home, monkeypatch, dummy_lwc):
+    def failing_generate(opts):
+        (tmp_path / "dest_during_failure").write_text(opts.dest)
+        raise RuntimeError("injected generation failure")
+
+    monkeypatch.setattr(cli, "generate", failing_generate)
+    with pytest.raises(RuntimeError, match="injected"):
+        generate(tmp_path / "dest", *dummy_lwc, *ARGS, "--seed", "5")
+    # the test vectors were generated into a staging directory of the cache
+    staging_dir = (tmp_path / "dest_during_failure").read_text()
+    assert ".staging-" in staging_dir
+    assert cache_entries(home) == []
+
+
+def test_verify_lib_skipped_on_hit(tmp_path, home, caplog, dummy_lwc):
+    generate(tmp_path / "first", *dummy_lwc, *ARGS, "--seed", "5", "--verify_lib")
+    assert "--verify_lib is skipped" not in caplog.text
+    generate(tmp_path / "second", *dummy_lwc, *ARGS, "--seed", "5", "--verify_lib")
+    assert "--verify_lib is skipped" in caplog.text
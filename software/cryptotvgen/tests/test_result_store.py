@@ -0,0 +1,58 @@
+"""
+Library outputs are reused from `--result_store` by later runs
+"""
+
+import filecmp
+import sqlite3
+
+from cryptotvgen import cli, generator
+from cryptotvgen.result_store import DB_NAME
+
+ARGS = [
+    "--hash", "dummy_lwc",
+    "--gen_test_combined", "1", "20", "0",
+    "--seed", "9",
+]  # fmt: skip
+
+
+def generate(dest, *args):
+    # outputs in the memo of a previous run are not looked up in the store
+    generator.memo.clear()
+    cli.run_cryptotvgen([*args, "--dest", str(dest)], logfile=None)
+    return sorted(p.name for p in dest.iterdir())
+
+
+def assert_same_files(a, b, files):
+    _, mismatch, errors = filecmp.cmpfiles(a, b, files, shallow=False)
+    assert not mismatch and not errors
+
+
+def no_library_call(*args):
+    raise AssertionError("library called")
+
+
+def test_store_hit_on_second_run(tmp_path, home, monkeypatch, dummy_lwc):
+    files = generate(tmp_path / "first", *dummy_lwc, *ARGS, "--result_store")
+    with sqlite3.connect(str(home / ".cryptotvgen" / "cache" / DB_NAME)) as db:
+        libs = [lib for lib, in db.execute("SELECT DISTINCT lib FROM results")]
+    # AEAD and hash outputs
+    assert len(libs) == 2
+
+    monkeypatch.setattr(generator, "batch_aead_encrypt", no_library_call)
+    monkeypatch.setattr(generator, "batch_crypto_hash", no_library_call)
+    monkeypatch.setattr(generator.TestVector, "library_output", no_library_call)
+    assert generate(tmp_path / "second", *dummy_lwc, *ARGS, "--result_store") == files
+    assert_same_files(tmp_path / "first", tmp_path / "second", files)
+
+
+def test_stored_outputs_match_library(tmp_path, home, dummy_lwc):
+    generate(tmp_path / "store", *dummy_lwc, *ARGS, "--result_store")
+    # all outputs of this run are read from the store
+    files = generate(tmp_path / "stored", *dummy_lwc, *ARGS, "--result_store")
+    assert generate(tmp_path / "fresh", *dummy_lwc, *ARGS) == files
+    assert_same_files(tmp_path / "stored", tmp_path / "fresh", files)
+
+
+def test_without_store(tmp_path, home, dummy_lwc):
+    generate(tmp_path, *dummy_lwc, *ARGS)
+    assert not (home / ".cryptotvgen" / "cache" / DB_NAME).exists()
@@ -0,0 +1,66 @@
+"""
+Runs with random data are reproducible from `--seed`, which is recorded in the
+header of the test vector files
+"""
+
+import filecmp
+import re
+
+import pytest
+
+from cryptotvgen import cli
+
+FILES = ["pdi.txt", "sdi.txt", "do.txt"]
+
+CASES = {
+    "gen_random": ["--gen_random", "30", "--max_ad", "100"],
+    "numpy": ["--gen_random", "30", "--data_source", "numpy"],
+    "gen_test_combined": ["--hash", "dummy_lwc", "--gen_test_combined", "1", "20", "0"],
+}  # fmt: skip
+
+
+def generate(dest, *args):
+    if "numpy" in args:
+        pytest.importorskip("numpy")
+    cli.run_cryptotvgen([*args, "--dest", str(dest)], logfile=None)
+
+
+def header_value(path, opt):
+    match = re.search(rf"^# {opt} +- (.*)$", path.read_text(), re.MULTILINE)
+    return match and match.group(1)
+
+
+def same_files(a, b):
+    _, mismatch, errors = filecmp.cmpfiles(a, b, FILES, shallow=False)
+    assert not errors
+    return not mismatch
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_same_seed_same_files(tmp_path, dummy_lwc, case):
+    generate(tmp_path / "a", *dummy_lwc, *CASES[case], "--seed", "11")
+    generate(tmp_path / "b", *dummy_lwc, *CASES[case], "--seed", "11")
+    generate(tmp_path / "c", *dummy_lwc, *CASES[case], "--seed", "12")
+    assert same_files(tmp_path / "a", tmp_path / "b")
+    assert not same_files(tmp_path / "a", tmp_path / "c")
+    assert header_value(tmp_path / "a" / "pdi.txt", "seed") == "11"
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_drawn_seed_is_recorded(tmp_path, dummy_lwc, case):
+    generate(tmp_path / "drawn", *dummy_lwc, *CASES[case])
+    seed = header_value(tmp_path / "drawn" / "pdi.txt", "seed")
+    assert seed and seed.isdigit()
+    generate(tmp_path / "rerun", *dummy_lwc, *CASES[case], "--seed", seed)
+    assert same_files(tmp_path / "drawn", tmp_path / "rerun")
+
+
+def test_deterministic_run_has_no_seed(tmp_path, dummy_lwc):
+    generate(
+        tmp_path,
+        *dummy_lwc,
+        "--gen_custom", "1,0,5,5,0:0,1,0,7,0",
+        "--gen_custom_mode", "1",
+    )  # fmt: skip
+    assert header_value(tmp_path / "pdi.txt", "seed") is None
+    assert header_value(tmp_path / "pdi.txt", "data_source") is None
@@ -0,0 +1,46 @@
+"""
+Output files of a failed run are visibly incomplete
+"""
+
+import pytest
+
+from cryptotvgen import cli, generator
+
+ARGS = [
+    "--gen_random", "40",
+    "--seed", "1",
+    "--verify_lib",
+    "--binary_kat",
+]  # fmt: skip
+
+
+def generate(dest, *args):
+    cli.run_cryptotvgen([*args, *ARGS, "--dest", str(dest)], logfile=None)
+
+
+def test_complete_files_end_with_eof(tmp_path, dummy_lwc):
+    generate(tmp_path, *dummy_lwc)
+    for name in ("pdi.txt", "sdi.txt", "do.txt"):
+        assert (tmp_path / name).read_text().endswith("###EOF\n")
+    assert (tmp_path / "pdi.bin").exists()
+
+
+@pytest.mark.parametrize("chunk_size", [None, "10"])
+def test_failed_run_has_no_eof(tmp_path, monkeypatch, dummy_lwc, chunk_size):
+    verify = generator.TestVector.verify
+
+    def failing_verify(tv):
+        assert tv.msg_id != 25, "injected verification failure"
+        verify(tv)
+
+    monkeypatch.setattr(generator.TestVector, "verify", failing_verify)
+    args = [*dummy_lwc, "--chunk_size", chunk_size] if chunk_size else dummy_lwc
+    with pytest.raises(AssertionError, match="injected"):
+        generate(tmp_path, *args)
+    pdi_files = sorted(tmp_path.glob("pdi*.txt"))
+    assert pdi_files
+    # chunks completed before the failure are complete
+    for pdi in pdi_files[:-1]:
+        assert pdi.read_text().endswith("###EOF\n")
+    assert "###EOF" not in pdi_files[-1].read_text()
+    assert not pdi_files[-1].with_suffix(".bin").exists()